@@ -0,0 +1,38 @@
+#! /usr/bin/env python3
+
+"""Checking of a tree of files by format_files with pools of processes.
+
+Run from project root: python3 -m bench.batch
+
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from src.cli import find_files, format_files
+from bench.corpus import corpus
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        for i in range(400):  # files of 1 to 100 forms, a few large ones
+            forms = 400 if i % 100 == 0 else 1 + i % 100
+            with open(os.path.join(directory, 'file-%d.el' % i), 'w') as file:
+                file.write(corpus(forms))
+        paths = find_files([directory])
+        jobs = 1
+        while jobs <= (os.cpu_count() or 1):
+            start = time.perf_counter()
+            format_files(paths, 'check', jobs)
+            print('%2d jobs %8.1f ms' % (
+                jobs, (time.perf_counter() - start) * 1000))
+            jobs *= 2
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
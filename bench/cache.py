@@ -0,0 +1,43 @@
+#! /usr/bin/env python3
+
+"""Formatting of a corpus with cold and warm FormatCache.
+
+Run from project root: python3 -m bench.cache
+
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from src import parse, parse_lazy, FormatCache
+from bench.corpus import corpus
+
+
+def main():
+    source = corpus(10000)
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'cache.sqlite')
+        start = time.perf_counter()
+        parse(source).pprint()
+        print('no cache    %7.1f ms' % ((time.perf_counter() - start) * 1000))
+        for name in ('cold cache', 'warm cache'):
+            with FormatCache(path) as cache:
+                start = time.perf_counter()
+                parse_lazy(source).pprint(cache)
+                print('%-11s %7.1f ms' % (
+                    name, (time.perf_counter() - start) * 1000))
+        edited = source.replace('function-5000 ', 'function-5000-new ')
+        with FormatCache(path) as cache:
+            start = time.perf_counter()
+            parse_lazy(edited).pprint(cache)
+            print('one edited  %7.1f ms, %s misses' % (
+                (time.perf_counter() - start) * 1000, cache.misses))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+#! /usr/bin/env python3
+
+"""Synthetic elisp corpus for benchmarks."""
+
+FORM = '''\
+;; Function number %d
+(defun function-%d (arg-one arg-two)
+  "Docstring of function %d."
+  (let ((value (+ arg-one %d))
+        (name "name-%d"))
+    (if (and value name)
+        (setf arg-one value
+              arg-two name)
+      (message "nothing %%s" arg-two))))
+'''
+
+
+def corpus(forms=1000):
+    """Return elisp source with forms top-level defuns."""
+    return ''.join(FORM % ((i,) * 5) for i in range(forms))
@@ -0,0 +1,25 @@
+#! /usr/bin/env python3
+
+"""Speed of parse and iterparse.
+
+Run from project root: python3 -m bench.events
+
+"""
+
+import timeit
+
+from src import parse, iterparse
+from bench.corpus import corpus
+
+
+def main():
+    source = corpus(2000)
+    for name, function in (('parse', parse),
+                           ('iterparse', lambda s: sum(1 for _ in iterparse(s)))):
+        seconds = min(timeit.repeat(lambda: function(source),
+                                    number=1, repeat=3))
+        print('%-10s %6.1f ms' % (name, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+#! /usr/bin/env python3
+
+"""Time to the first form and memory of parse and parse_lazy.
+
+Run from project root: python3 -m bench.lazy
+
+"""
+
+import timeit
+import tracemalloc
+
+from src import parse, parse_lazy
+from bench.corpus import corpus
+
+
+def first_form(function, source):
+    """Return the first form of source parsed by function."""
+    return function(source)[0]
+
+
+def main():
+    source = corpus(5000)  # about 50k lines
+    for name, function in (('parse', parse), ('parse_lazy', parse_lazy)):
+        seconds = min(timeit.repeat(lambda: first_form(function, source),
+                                    number=1, repeat=3))
+        tracemalloc.start()
+        program = function(source)
+        program[0]
+        size = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('%-10s first form %7.1f ms, peak %6.1f MB' % (
+            name, seconds * 1000, size / 2 ** 20))
+    seconds = min(timeit.repeat(lambda: len(parse_lazy(source)),
+                                number=1, repeat=3))
+    print('skim whole source %7.1f ms' % (seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+#! /usr/bin/env python3
+
+"""Memory retained by nodes of parsed corpus.
+
+Run from project root: python3 -m bench.memory
+
+"""
+
+import gc
+import tracemalloc
+
+from src import parse
+from src.nodes.base import BaseList, Quote
+from bench.corpus import corpus
+
+
+def count(program):
+    """Return number of atoms, comments, quotes and lists of program."""
+    nodes = 0
+    stack = [program]
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        if isinstance(node, Quote):
+            stack.append(node.node)
+        elif isinstance(node, BaseList):
+            stack.extend(node.children)
+            for comments in node.comments.values():
+                stack.extend(comments)
+    return nodes
+
+
+def main():
+    source = corpus(5000)  # about 50k lines
+    gc.collect()
+    tracemalloc.start()
+    program = parse(source)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    nodes = count(program)
+    print('%d nodes, %.1f MB, %.1f bytes per node' % (
+        nodes, size / 2 ** 20, size / nodes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#! /usr/bin/env python3
+
+"""Peak memory of formatting growing files by parse and write_forms.
+
+Every file is formatted in a new process, so its peak resident memory
+(VmHWM, it isn't inherited from parent process like ru_maxrss) is
+measured alone. Memory of parse grows with file size,
+memory of write_forms should stay about the same.
+
+Run from project root: python3 -m bench.stream
+
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from src import MmapLispStream, parse, write_forms
+from bench.corpus import corpus
+
+
+def peak():
+    """Return peak resident memory of process in KB."""
+    try:
+        with open('/proc/self/status', encoding='ascii') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run(path, mode):
+    """Format file at path by mode to os.devnull, print peak memory."""
+    with MmapLispStream(path) as stream, \
+            open(os.devnull, 'w', encoding='utf-8') as sink:
+        if mode == 'parse':
+            parse(stream).write(sink)
+        else:
+            write_forms(stream, sink)
+    print(peak())
+
+
+def main():
+    descriptor, path = tempfile.mkstemp(suffix='.el')
+    os.close(descriptor)
+    try:
+        for forms in (2500, 10000, 40000):
+            with open(path, 'w', encoding='utf-8') as file:
+                for _ in range(forms // 2500):
+                    file.write(corpus(2500))
+            size = os.path.getsize(path)
+            peaks = []
+            for mode in ('parse', 'write_forms'):
+                output = subprocess.check_output(
+                    [sys.executable, '-m', 'bench.stream', path, mode])
+                peaks.append(int(output) / 1024)
+            print('%6.1f MB file: parse %7.1f MB, write_forms %7.1f MB' % (
+                (size / 2 ** 20,) + tuple(peaks)))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        run(*sys.argv[1:])
+    else:
+        main()
@@ -0,0 +1,44 @@
+#! /usr/bin/env python3
+
+"""Loading of a style config with many rules.
+
+Run from project root: python3 -m bench.style
+
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import timeit
+
+from src.style import Style, compile_rules, load_config, load_style
+
+# Number of indent rules of config
+RULES = 500
+# Number of loads timed
+NUMBER = 200
+
+
+def main():
+    config = {'indent': {'symbol-%d' % i: 'defun' if i % 3 == 0 else i % 4
+                         for i in range(RULES)}}
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'style.json')
+        with open(path, 'w') as file:
+            json.dump(config, file)
+        rules = compile_rules(config)
+        for name, function in (
+                ('read config', lambda: load_config(path)),
+                ('compile rules', lambda: compile_rules(config)),
+                ('build Style', lambda: Style(rules)),
+                ('load_style', lambda: load_style(path))):
+            seconds = timeit.timeit(function, number=NUMBER) / NUMBER
+            print('%-13s %7.3f ms' % (name, seconds * 1000))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
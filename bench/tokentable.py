@@ -0,0 +1,37 @@
+#! /usr/bin/env python3
+
+"""Memory per token of parsed tree and TokenTable.
+
+Run from project root: python3 -m bench.tokentable
+
+"""
+
+import tracemalloc
+
+from src import parse, tokenize, TokenTable
+from bench.corpus import corpus
+
+
+def allocated(function, *args):
+    """Return result of function and size of memory it keeps allocated."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = function(*args)
+        return result, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    source = corpus(2000)
+    tokens = sum(1 for _ in tokenize(source))
+    print('%d tokens, %d characters' % (tokens, len(source)))
+    _, size = allocated(parse, source)
+    print('parse tree:  %6.1f bytes per token' % (size / tokens))
+    _, size = allocated(TokenTable.build, source)
+    print('token table: %6.1f bytes per token' % (size / tokens))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,24 @@
 """Sources."""
 
-from .stream import Stream
-from .lispstream import LispStream
-from .parser import parse, LispSyntaxError
-from .nodes import Atom, List
+from .stream import (
+    Stream, MmapStream, ChunkedStream, EncodedText, LineIndex,
+)
+from .lispstream import (
+    LispStream, MmapLispStream, ChunkedLispStream, tokenize, token_text, reference_tokens,
+    ATOM, STRING, COMMENT, OPEN, CLOSE, QUOTE, OPEN_VECTOR, CLOSE_VECTOR,
+)
+from .parser import (
+    parse, parse_table, iterparse, iterforms, write_forms, LispSyntaxError,
+)
+from .tokentable import TokenTable
+from .skim import skim, parse_lazy, LazyProgram
+from .incremental import reparse
+from .cache import FormatCache
+from .style import Style, StyleError, load_style, load_config, DEFAULT_STYLE
+from .indexer import IndentIndex, indent_declarations
+from .edits import format_edits, range_edits, format_range, apply_edits
+from .nodes import Atom, List, Quote, Vector
 from .tools import (
     abstractmethod, CallAbstractMethod, PYTHON_VERSION, DEBUG, DEFAULT_OPTIONS,
+    FORMAT_VERSION,
 )
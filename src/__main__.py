@@ -0,0 +1,10 @@
+#! /usr/bin/env python3
+
+"""Entry point of python3 -m src, see cli module."""
+
+import sys
+
+from .cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+#! /usr/bin/env python3
+
+"""Persistent cache of formatted top-level forms."""
+
+import hashlib
+import json
+import sqlite3
+import time
+
+from .tools import DEFAULT_OPTIONS, FORMAT_VERSION
+
+
+class FormatCache:
+    """Cache of formatted top-level forms stored in SQLite file.
+
+    Formatted text is stored by digest of form source, formatter options,
+    Style digest and FORMAT_VERSION, so same forms are not formatted
+    twice. Least recently used forms are evicted when there are more
+    than max_entries of them.
+
+    Lookups are read from file immediately, new forms and use times are
+    written by commit in one transaction. File is in WAL mode and writers
+    wait for each other up to timeout seconds, so cache can be shared by
+    several processes.
+
+    """
+
+    def __init__(self, path, max_entries=100000, options=None, timeout=30.0,
+                 style=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        options = DEFAULT_OPTIONS if options is None else options
+        self._salt = ('%s\0%s\0%s\0' % (
+            FORMAT_VERSION, json.dumps(options, sort_keys=True),
+            'default' if style is None else style.digest)).encode()
+        self._pending = {}
+        self._used = set()
+        self._clock = 0.0
+        self._connection = _connect(path, timeout)
+        self._transaction(
+            'CREATE TABLE IF NOT EXISTS forms ('
+            'key BLOB PRIMARY KEY, text TEXT NOT NULL, used REAL NOT NULL)',
+            'CREATE INDEX IF NOT EXISTS forms_used ON forms (used)')
+
+    def __len__(self):
+        return self._connection.execute(
+            'SELECT count(*) FROM forms').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def key(self, source):
+        """Return cache key of form source text."""
+        return hashlib.blake2b(
+            self._salt + source.encode('utf-8'), digest_size=16).digest()
+
+    def get(self, source):
+        """Return formatted text of form source or None if it's missed."""
+        key = self.key(source)
+        if key in self._pending:
+            self.hits += 1
+            return self._pending[key]
+        row = self._connection.execute(
+            'SELECT text FROM forms WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used.add(key)
+        return row[0]
+
+    def put(self, source, text):
+        """Add formatted text of form source, it's written by commit."""
+        self._pending[self.key(source)] = text
+
+    def commit(self):
+        """Write new forms and use times, evict least recently used."""
+        if not self._pending and not self._used:
+            return
+        used = self._clock = max(time.time(), self._clock + 1e-6)
+        pending, self._pending = self._pending, {}
+        keys, self._used = self._used, set()
+
+        def write(cursor):
+            """Write forms and evict old ones."""
+            cursor.executemany(
+                'INSERT OR REPLACE INTO forms VALUES (?, ?, ?)',
+                ((key, text, used) for key, text in pending.items()))
+            cursor.executemany(
+                'UPDATE forms SET used = ? WHERE key = ?',
+                ((used, key) for key in keys))
+            extra = cursor.execute(
+                'SELECT count(*) FROM forms').fetchone()[0] - self.max_entries
+            if extra > 0:
+                cursor.execute(
+                    'DELETE FROM forms WHERE key IN '
+                    '(SELECT key FROM forms ORDER BY used LIMIT ?)', (extra,))
+
+        self._transaction(write)
+
+    def clear(self):
+        """Remove all forms."""
+        self._pending.clear()
+        self._used.clear()
+        self._transaction('DELETE FROM forms')
+
+    def close(self):
+        """Commit and close cache file."""
+        if self._connection is not None:
+            self.commit()
+            self._connection.close()
+            self._connection = None
+
+    def _transaction(self, *statements):
+        """Run statements (SQL or functions of cursor) in write
+        transaction."""
+        _transaction(self._connection, *statements)
+
+
+def _connect(path, timeout):
+    """Open SQLite file in WAL mode shared by several processes."""
+    connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+
+def _transaction(connection, *statements):
+    """Run statements (SQL or functions of cursor) in write transaction
+    of connection."""
+    cursor = connection.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        for statement in statements:
+            if callable(statement):
+                statement(cursor)
+            else:
+                cursor.execute(statement)
+    except BaseException:
+        cursor.execute('ROLLBACK')
+        raise
+    cursor.execute('COMMIT')
@@ -0,0 +1,276 @@
+#! /usr/bin/env python3
+
+"""Command line interface, run it as python3 -m src.
+
+Files are formatted in place, checked (--check) or their changes are
+printed as unified diff (--diff). Directories are searched for files
+matching include globs recursively. With --jobs files are formatted by
+a pool of processes, the largest files are sent first, so a single big
+file doesn't finish the run alone, and results are reported in order
+of paths whatever order files are done in.
+
+Exit status is 0 if nothing is changed, 1 if some files are (or would
+be with --check) changed and 2 if some files can't be formatted.
+
+"""
+
+import argparse
+import difflib
+import fnmatch
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from .cache import FormatCache
+from .edits import apply_edits, format_edits
+from .lispstream import LispSyntaxError
+from .indexer import IndentIndex
+from .style import StyleError, load_config, load_style
+from .tools import DEFAULT_OPTIONS
+
+# Exit statuses
+EXIT_CHANGED = 1
+EXIT_ERROR = 2
+
+# Default globs of files searched in directories
+INCLUDE = ('*.el',)
+
+# Formatter of the current process set by _init_formatter: options,
+# style and cache
+_FORMATTER = {}
+
+
+def _matches(name, globs):
+    """Check if file name matches one of globs."""
+    return any(fnmatch.fnmatchcase(name, glob) for glob in globs)
+
+
+def find_files(paths, include=INCLUDE, exclude=()):
+    """Return sorted paths of files to format.
+
+    Files of paths are taken as is, directories are searched
+    recursively for files which names match include globs. Files and
+    directories which names or paths relative to searched directory
+    match exclude globs are skipped.
+
+    """
+    found = set()
+    for path in paths:
+        if not os.path.isdir(path):
+            found.add(os.path.normpath(path))
+            continue
+        for directory, directories, files in os.walk(path):
+            relative = os.path.relpath(directory, path)
+            directories[:] = [
+                name for name in directories if not _matches(name, exclude)
+                and not _matches(os.path.join(relative, name), exclude)]
+            for name in files:
+                if _matches(name, include) and \
+                   not _matches(name, exclude) and \
+                   not _matches(os.path.join(relative, name), exclude):
+                    found.add(os.path.normpath(os.path.join(directory, name)))
+    return sorted(found)
+
+
+def format_source(source, cache=None, options=None, style=None):
+    """Return pretty form of file text: formatted program ending with new
+    line (empty text stays empty).
+
+    :raises LispSyntaxError: if source is not valid lisp program.
+
+    """
+    text = apply_edits(source, format_edits(source, cache, options, style))
+    if text and not text.endswith('\n'):
+        text += '\n'
+    return text
+
+
+def _write(path, text):
+    """Replace file text atomically keeping file mode."""
+    mode = os.stat(path).st_mode
+    descriptor, temporary = tempfile.mkstemp(
+        dir=os.path.dirname(path) or '.', prefix='.elformat-')
+    try:
+        with os.fdopen(descriptor, 'w', encoding='utf-8',
+                       newline='') as file:
+            file.write(text)
+        os.chmod(temporary, mode)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def _diff(source, text, path):
+    """Return unified diff of source and formatted text of file."""
+    lines = []
+    for line in difflib.unified_diff(source.splitlines(True),
+                                     text.splitlines(True), path, path):
+        lines.append(line)
+        if not line.endswith('\n'):
+            lines.append('\n\\ No newline at end of file\n')
+    return ''.join(lines)
+
+
+def _init_formatter(options, style_path, cache_path, index_path=None):
+    """Set formatter of the current process.
+
+    It's called once in every worker of pool, so style is loaded and
+    cache is opened once for all files worker formats. If index_path is
+    given, style has rules of IndentIndex file and style config rules
+    override them.
+
+    """
+    if index_path is not None:
+        config = {} if style_path is None else load_config(style_path)
+        with IndentIndex(index_path) as index:
+            style = index.style(config)
+    else:
+        style = None if style_path is None else load_style(style_path)
+    _FORMATTER['options'] = options
+    _FORMATTER['style'] = style
+    _FORMATTER['cache'] = None if cache_path is None else \
+        FormatCache(cache_path, options=options, style=style)
+
+
+def _format_file(path, mode):
+    """Format file by formatter of the current process.
+
+    Mode is 'write', 'check' or 'diff'. Return (changed, diff, error)
+    where diff is unified diff text in 'diff' mode and error is a
+    message if file can't be formatted.
+
+    """
+    try:
+        with open(path, encoding='utf-8', newline='') as file:
+            source = file.read()
+        text = format_source(source, _FORMATTER['cache'],
+                             _FORMATTER['options'], _FORMATTER['style'])
+        if text == source:
+            return (False, None, None)
+        if mode == 'write':
+            _write(path, text)
+        elif mode == 'diff':
+            return (True, _diff(source, text, path), None)
+        return (True, None, None)
+    except (OSError, UnicodeDecodeError, LispSyntaxError) as error:
+        return (False, None, str(error))
+
+
+def format_files(paths, mode='write', jobs=1, options=None,
+                 style_path=None, cache_path=None, index_path=None):
+    """Format files and return list of their (changed, diff, error) in
+    order of paths, see _format_file.
+
+    If jobs is more than 1, files are formatted by a pool of jobs
+    processes. Files are sent to workers from the largest to the
+    smallest one (longest processing time first), so workers finish at
+    about the same time.
+
+    :param mode: 'write' to rewrite files, 'check' or 'diff'.
+    :param style_path: path of style config, see load_style.
+    :param cache_path: path of FormatCache file shared by workers.
+    :param index_path: path of IndentIndex file, indent declarations of
+      paths are indexed before formatting and used as style rules.
+    :raises StyleError: if style config is not valid.
+
+    """
+    options = DEFAULT_OPTIONS if options is None else options
+    if index_path is not None:
+        with IndentIndex(index_path) as index:
+            index.update(paths)
+    if jobs <= 1 or len(paths) <= 1:
+        _init_formatter(options, style_path, cache_path, index_path)
+        try:
+            return [_format_file(path, mode) for path in paths]
+        finally:
+            if _FORMATTER['cache'] is not None:
+                _FORMATTER['cache'].close()
+
+    if style_path is not None:  # raise config errors here, not in workers
+        _init_formatter(options, style_path, None, index_path)
+    sizes = []
+    for path in paths:
+        try:
+            sizes.append(os.path.getsize(path))
+        except OSError:
+            sizes.append(0)
+    order = sorted(range(len(paths)), key=lambda i: -sizes[i])
+    results = [None] * len(paths)
+    with ProcessPoolExecutor(jobs, initializer=_init_formatter,
+                             initargs=(options, style_path, cache_path,
+                                       index_path)) as pool:
+        for i, result in zip(order, pool.map(
+                _format_file, [paths[i] for i in order],
+                [mode] * len(paths))):
+            results[i] = result
+    return results
+
+
+def _parser():
+    """Return parser of command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog='python3 -m src', description='Format elisp files.')
+    parser.add_argument('paths', nargs='+', metavar='PATH',
+                        help='file or directory to format')
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--check', action='store_true',
+                        help="don't write files, exit with status 1 "
+                        'if some of them would be changed')
+    action.add_argument('--diff', action='store_true',
+                        help="don't write files, print their changes")
+    parser.add_argument('--include', action='append', metavar='GLOB',
+                        help='glob of file names searched in directories '
+                        '(default: %s)' % ', '.join(INCLUDE))
+    parser.add_argument('--exclude', action='append', default=[],
+                        metavar='GLOB',
+                        help='glob of skipped file or directory names '
+                        'or relative paths')
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help='number of processes, 0 is number of CPUs')
+    parser.add_argument('--line-width', type=int,
+                        default=DEFAULT_OPTIONS['line_width'], metavar='N',
+                        help='width of lines (default: %(default)s)')
+    parser.add_argument('--compact', action='store_true',
+                        help='print nested lists in one line if they fit')
+    parser.add_argument('--style', metavar='PATH',
+                        help='JSON config of indentation style')
+    parser.add_argument('--cache', metavar='PATH',
+                        help='file of cache of formatted forms')
+    parser.add_argument('--index', metavar='PATH',
+                        help='file of index of indent declarations of '
+                        'formatted files, they are used as style rules')
+    return parser
+
+
+def main(argv=None):
+    """Run command line interface with argv arguments (sys.argv by
+    default), return exit status."""
+    args = _parser().parse_args(argv)
+    mode = 'check' if args.check else 'diff' if args.diff else 'write'
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    options = dict(DEFAULT_OPTIONS, line_width=args.line_width,
+                   compact=args.compact)
+    paths = find_files(args.paths, args.include or INCLUDE, args.exclude)
+    try:
+        results = format_files(paths, mode, jobs, options, args.style,
+                               args.cache, args.index)
+    except (OSError, StyleError) as error:
+        print('error: %s' % error, file=sys.stderr)
+        return EXIT_ERROR
+
+    status = 0
+    for path, (changed, diff, error) in zip(paths, results):
+        if error is not None:
+            print('error: %s: %s' % (path, error), file=sys.stderr)
+            status = EXIT_ERROR
+        elif changed:
+            if diff is not None:
+                sys.stdout.write(diff)
+            elif mode == 'check':
+                print('would reformat %s' % path, file=sys.stderr)
+            else:
+                print('reformatted %s' % path, file=sys.stderr)
+            status = status or EXIT_CHANGED
+    return status
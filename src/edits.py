@@ -0,0 +1,184 @@
+#! /usr/bin/env python3
+
+"""Formatting as a list of edits of source."""
+
+from .nodes.base import BaseList, Quote, _emit
+from .parser import parse
+from .skim import parse_lazy, skim
+
+# Size of source chunks which newlines are counted at once
+_LINES_CHUNK = 1 << 16
+
+
+def format_edits(source, cache=None, options=None, style=None):
+    """Return edits (start, end, replacement) which turn source string
+    into it's pretty form.
+
+    Source is compared with pretty form by top-level forms and text
+    between them (whitespaces and comments), so unchanged forms are
+    only compared as strings. Adjacent changed parts are merged into
+    one edit. Edits are sorted, apply_edits(source, edits) is equal to
+    parse(source).pprint().
+
+    :param cache: FormatCache, forms found in it are not parsed.
+    :param options: pprint options.
+    :param style: Style of lists indentation.
+    :raises LispSyntaxError: if source is not valid lisp program.
+
+    """
+    program = parse_lazy(source, style)
+    edits = []
+    position = 0
+
+    def compare(start, end, text):
+        """Add edit if text differs from source between start and end."""
+        if source[start:end] == text:
+            return
+        if edits and edits[-1][1] == start:
+            edits[-1] = (edits[-1][0], end, edits[-1][2] + text)
+        else:
+            edits.append((start, end, text))
+
+    for k, offset, text in program.parts():
+        if k is None:
+            compare(position, len(source), text)
+            break
+        start, end = program.get_span(k)
+        compare(position, start, text)
+        compare(start, end, program.format_form(k, offset, cache, options))
+        position = end
+    if cache is not None:
+        cache.commit()
+    return edits
+
+
+def _skip_lines(source, count, position=0):
+    """Return offset after count newlines of source from position or
+    length of source if there are less newlines."""
+    size = len(source)
+    while count:
+        end = position + _LINES_CHUNK
+        newlines = source.count('\n', position, end)
+        if newlines < count and end < size:
+            count -= newlines
+            position = end
+            continue
+        for _ in range(count):
+            position = source.find('\n', position) + 1
+            if not position:
+                return size
+        break
+    return position
+
+
+def _region_forms(source, position, start, end):
+    """Return spans of top-level forms skimmed from position which
+    intersect region between start and end."""
+    forms = []
+    for kind, form_start, form_end in skim(source, position):
+        if form_start >= end:
+            break
+        if kind == 'form' and form_end > start:
+            forms.append((form_start, form_end))
+    return forms
+
+
+def _enclosing_node(root, start, end):
+    """Return (node, trailing) of the smallest list of root which
+    encloses region between start and end, or (root, 0).
+
+    Region is enclosed if it starts after list start, so indentation of
+    region first line is placed by the list. trailing is width of close
+    braces after node, see _emit.
+
+    """
+    node, trailing = root, 0
+    while True:
+        parent = node
+        while isinstance(parent, Quote):
+            parent = parent.node
+        children = parent.children if isinstance(parent, BaseList) else ()
+        for i, child in enumerate(children):
+            while isinstance(child, Quote):
+                child = child.node
+            if isinstance(child, BaseList) and child.start < start and \
+               end <= child.end:
+                trailing = trailing + len(parent.close_brace) \
+                    if i == len(children) - 1 else 0
+                node = child
+                break
+        else:
+            return node, trailing
+
+
+def range_edits(source, start_line, end_line, options=None, style=None):
+    """Return edits (start, end, replacement) which format part of
+    source string between lines start_line and end_line inclusive.
+
+    Top-level forms intersecting the region are formatted, or the
+    smallest list enclosing the region if it's inside of one form: the
+    whole form is parsed, so list keeps class given by its parent (like
+    bindings of let) and it's printed at its column in source with close
+    braces after it, text outside of it is not changed. So if text
+    before the region is already pretty, lines of the region are the
+    same as in pretty form of source. Lines are numbered from 1 like in
+    LineIndex.
+
+    Top-level forms are found by skimming source from its start: open
+    brace at column 0 isn't always a form start (it may be inside of a
+    string), and skim only scans forms before the region, it doesn't
+    parse them.
+
+    :param options: pprint options.
+    :param style: Style of lists indentation.
+    :raises IndexError: if start_line is less than 1.
+    :raises LispSyntaxError: if forms before or around the region are not
+      valid.
+
+    """
+    if start_line < 1:
+        raise IndexError('line number out of range')
+    first = start = _skip_lines(source, start_line - 1)
+    end = _skip_lines(source, end_line - start_line + 1, start)
+    region = source[start:end]
+    start += len(region) - len(region.lstrip())
+    end -= len(region) - len(region.rstrip())
+    if start >= end:
+        return []
+
+    edits = []
+    for form_start, form_end in _region_forms(source, 0, start, end):
+        program = parse(source[form_start:form_end], style=style)
+        node, trailing = _enclosing_node(
+            program[0], start - form_start, end - form_start)
+        node_start, node_end = form_start + node.start, form_start + node.end
+        line = source.rfind('\n', 0, node_start) + 1
+        node.offset = node_start - line
+        if node is program[0] and line >= first and \
+           not source[line:node_start].strip():  # indented form in region
+            node_start, node.offset = line, 0
+        result = []
+        _emit(node, result.append, options, program.source, trailing)
+        result = ''.join(result)
+        if result != source[node_start:node_end]:
+            edits.append((node_start, node_end, result))
+    return edits
+
+
+def format_range(source, start_line, end_line, options=None, style=None):
+    """Return source string with part between lines start_line and
+    end_line formatted, see range_edits."""
+    return apply_edits(
+        source, range_edits(source, start_line, end_line, options, style))
+
+
+def apply_edits(source, edits):
+    """Return source with sorted not overlapping edits applied."""
+    result = []
+    position = 0
+    for start, end, replacement in edits:
+        result.append(source[position:start])
+        result.append(replacement)
+        position = end
+    result.append(source[position:])
+    return ''.join(result)
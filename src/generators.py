@@ -12,9 +12,13 @@ for list with n nodes generator must return n+1 value because
 first value is for place before first node and last value
 is for place after last node.
 
+Generators of alignment rules have layout attribute, the same rules
+compiled by compile_layout, it's used by printer instead of generator.
+
 """
 
 from .tools import abstractmethod
+from .layout import compile_layout
 
 # pylint: disable=unused-argument
 
@@ -48,6 +52,9 @@ def default_flat_generator(node):
         yield value
     yield ('', offset)
 
+default_flat_generator.layout = compile_layout(
+    (1, '', 1, False), (None, ' ', 2, False))
+
 
 def default_nested_generator(node):
     """Generator.
@@ -66,6 +73,9 @@ def default_nested_generator(node):
         yield value
     yield ('\n', offset)
 
+default_nested_generator.layout = compile_layout(
+    (1, '', 1, False), (None, '\n', 2, False))
+
 
 def first_brace_align_generator(node):
     """Generator.
@@ -84,6 +94,9 @@ def first_brace_align_generator(node):
         yield value
     yield ('', offset)
 
+first_brace_align_generator.layout = compile_layout(
+    (1, '', 1, False), (None, '\n', 1, False))
+
 
 def function_align_generator_f(n=None):
     """Fabric of generators.
@@ -111,6 +124,8 @@ def function_align_generator_f(n=None):
             for _ in range(len(node.children) - 2):
                 yield value
             yield ('', offset)
+        function_align_generator_.layout = compile_layout(
+            (1, '', 1, False), (1, ' ', 2, True), (None, '\n', 2, True))
     else:
         def function_align_generator_(node):
             """Align first %d arguments by function name."""
@@ -126,6 +141,9 @@ def function_align_generator_f(n=None):
                 yield value
             yield ('', 0)
         function_align_generator_.__doc__ = function_align_generator_.__doc__ % n
+        function_align_generator_.layout = compile_layout(
+            (1, '', 1, False), (1, ' ', 2, True), (n - 1, '\n', 2, True),
+            (None, '\n', 2, False))
     return function_align_generator_
 
 function_align_generator = function_align_generator_f()
@@ -0,0 +1,243 @@
+#! /usr/bin/env python3
+
+"""Incremental reparse of edited source."""
+
+from itertools import count, repeat
+
+from .lispstream import (
+    LispStream, LispSyntaxError, TOKEN_REGEXP, tokenize)
+from .nodes import (
+    Atom, Comment, CommentTable, Quote, Program, List, FirstBraceAlignList,
+    wrap_list)
+from .nodes.base import BaseList
+from .parser import StackElement, _build, _nodes, parse
+
+
+def _items(node):
+    """Return children and comments of list node ordered by position."""
+    items = []
+    comments = node.comments
+    for i, child in enumerate(node.children):
+        items.extend(comments.get(i, ()))
+        items.append(child)
+    items.extend(comments.get(len(node.children), ()))
+    return items
+
+
+def _element(items, node, delta):
+    """Return StackElement with items to rewrap list node.
+
+    End of node is moved by delta.
+
+    """
+    element = StackElement(node.open_brace, node.close_brace, node.start)
+    element.end = node.end + delta
+    for item in items:
+        if isinstance(item, Comment):
+            element.add_comment(item)
+        else:
+            element.append(item)
+    return element
+
+
+def _plain(node, nodes):
+    """Return list node wrapped like wrap_list wraps a new list.
+
+    Parents like let rewrap their children (see LetList), so reused
+    child of list which head is changed has to get it's own class back.
+
+    """
+    if node.open_brace == '[':
+        return node
+    cls = List
+    if node.children:
+        func = node.children[0]
+        cls = List if func.isflat else FirstBraceAlignList
+        if isinstance(func, Atom):
+            cls = nodes.get(func.atom, cls)
+    return node if type(node) is cls else node.rewrap(cls)
+
+
+def _rewrap(items, node, delta, stream, nodes, table):
+    """Return list node or Program with new items, their comments are
+    added to CommentTable table."""
+    element = _element(items, node, delta)
+    element.comments = table.add(element.comments or ())
+    if isinstance(node, Program):
+        return Program(element, element.comments, 0,
+                       items[-1].end if items else 0, stream)
+    for i, child in enumerate(element):
+        if isinstance(child, BaseList):
+            element[i] = _plain(child, nodes)
+    return wrap_list(element, nodes)
+
+
+def _copy(node, delta):
+    """Return copy of node with bounds moved by delta."""
+    cls = type(node)
+    copy = cls.__new__(cls)
+    for base in cls.__mro__:
+        for name in getattr(base, '__slots__', ()):
+            if hasattr(node, name):
+                setattr(copy, name, getattr(node, name))
+    copy.start += delta
+    copy.end += delta
+    return copy
+
+
+def _shift(node, delta, table):
+    """Return copy of node with bounds of it and all it's subnodes moved
+    by delta, comments of copied lists are added to table.
+
+    Nodes are copied instead of changed, because they still belong to
+    program reparse was called with.
+
+    """
+    root = [None]
+    stack = [(root, 0, node)]
+    while stack:
+        items, i, node = stack.pop()
+        copy = items[i] = _copy(node, delta)
+        while isinstance(node, Quote):
+            node = node.node
+            copy.node = _copy(node, delta)
+            copy = copy.node
+        if isinstance(node, BaseList):
+            children = copy.children = list(node.children)
+            stack.extend(zip(repeat(children), count(), children))
+            if node.comments:
+                comments = [comment for line in node.comments.values()
+                            for comment in line]
+                copy.comments = table.add(zip(
+                    (place for place, line in node.comments.items()
+                     for _ in line), comments))
+                stack.extend(zip(repeat(table.comments),
+                                 count(copy.comments.first), comments))
+    return root[0]
+
+
+def _inner_list(node, start, end):
+    """Return (list, quotes) if node is a list (maybe wrapped by quotes)
+    with edit from start to end between it's braces, else None."""
+    quotes = []
+    while isinstance(node, Quote):
+        quotes.append(node)
+        node = node.node
+    if isinstance(node, BaseList) and \
+       node.start + len(node.open_brace) <= start and \
+       end <= node.end - len(node.close_brace):
+        return node, quotes
+    return None
+
+
+def _path(program, start, end):
+    """Return nodes from program to the deepest list containing edit.
+
+    Each element is (node, index) where index is position of next
+    element in node children. Edit is contained in list if it's inside
+    list braces.
+
+    """
+    path = []
+    node = program
+    while node is not None:
+        parent, node = node, None
+        for i, child in enumerate(parent.children):
+            if child.start > start:
+                break
+            inner = _inner_list(child, start, end)
+            if inner is not None:
+                node, quotes = inner
+                path.append((parent, i))
+                path.extend((quote, None) for quote in quotes)
+                break
+    path.append((parent, None))
+    return path
+
+
+def _reparse_items(node, source, start, end, delta, tokenizer, stream,
+                   nodes, table):
+    """Reparse items of node touched by edit, return new items.
+
+    :raises LispSyntaxError: if edited items can't be parsed separately.
+
+    """
+    items = _items(node)
+    first, stop = 0, len(items)
+    while first < stop and items[first].end < start:
+        first += 1
+    while stop > first and items[stop - 1].start > end:
+        stop -= 1
+    before, touched, after = items[:first], items[first:stop], items[stop:]
+    first, last = start, end
+    if touched:  # comments after reader prefix are inside quote bounds
+        first = min(first, min(item.start for item in touched))
+        last = max(last, max(item.end for item in touched))
+    if before and before[-1].end > first or after and after[0].start < last:
+        raise LispSyntaxError('edit splits quote', first)
+    last += delta
+
+    tokens = list(tokenizer(source, first, last))
+    if tokens and last < len(source):  # last token may continue
+        _, token_start, token_end = tokens[-1]
+        if TOKEN_REGEXP.match(source, token_start).end() != token_end:
+            raise LispSyntaxError('edit changes next token', token_end)
+    region = _build(tokens, stream, nodes)
+
+    if delta:
+        after = [_shift(item, delta, table) for item in after]
+    return before + _items(region) + after
+
+
+def reparse(program, start, end, text, tokenizer=tokenize, style=None):
+    """Return Program of program source with text from start to end
+    replaced by text.
+
+    Only items (forms and comments) of the deepest list containing the
+    edit which are touched by it are parsed again. If they can't be
+    parsed alone (edit breaks list bounds), items of enclosing lists
+    are tried up to the whole source. Other nodes are moved to the new
+    program, bounds of nodes after the edit are shifted.
+
+    :param program: Program parsed from string.
+    :param tokenizer: function like tokenize with start and end bounds.
+    :param style: Style program was parsed with.
+    :raises LispSyntaxError: if edited source is not valid lisp program.
+
+    """
+    old = program.source.get_buffer()
+    source = old[:start] + text + old[end:]
+    delta = len(text) - (end - start)
+    stream = LispStream(source)
+    nodes = _nodes(style)
+    table = CommentTable()
+
+    path = _path(program, start, end)
+    for level in range(len(path) - 1, -1, -1):
+        node = path[level][0]
+        if isinstance(node, Quote):
+            continue
+        try:
+            items = _reparse_items(node, source, start, end, delta,
+                                   tokenizer, stream, nodes, table)
+        except LispSyntaxError:
+            continue
+        break
+    else:
+        return parse(source, tokenizer, style)
+
+    new = _rewrap(items, node, delta, stream, nodes, table)
+    for node, i in reversed(path[:level]):
+        if isinstance(node, Quote):
+            new = Quote(node.prefix, new, node.start, node.end + delta)
+            continue
+        items = _items(node)
+        child = node.children[i]
+        position = next(k for k, item in enumerate(items) if item is child)
+        if delta:
+            items[position + 1:] = [
+                _shift(item, delta, table)
+                for item in items[position + 1:]]
+        items[position] = new
+        new = _rewrap(items, node, delta, stream, nodes, table)
+    return new
@@ -0,0 +1,218 @@
+#! /usr/bin/env python3
+
+"""Project index of indent declarations of macros and functions.
+
+Definitions like
+
+    (defmacro with-foo (x &rest body)
+      "Doc."
+      (declare (indent 1))
+      ...)
+
+declare how calls of defined symbol are indented. IndentIndex collects
+these declarations from elisp files, so they are used as Style rules.
+
+"""
+
+import json
+import os
+
+from .cache import _connect, _transaction
+from .lispstream import LispSyntaxError, tokenize, ATOM, COMMENT, OPEN
+from .nodes import Atom
+from .nodes.base import BaseList
+from .parser import parse
+from .skim import skim
+from .style import Style
+
+# Definitions which indent declarations are collected
+DEFINERS = frozenset(('defmacro', 'defun', 'cl-defmacro'))
+
+def _head(node):
+    """Return head symbol of list node or None."""
+    if isinstance(node, BaseList) and node.children and \
+       isinstance(node.children[0], Atom):
+        return node.children[0].atom
+    return None
+
+
+def _definer(source, start, end):
+    """Return head symbol of list form of source from start to end, or
+    None if form is not a list starting with a symbol.
+
+    Only the first tokens of form are read, comments between open brace
+    and head are skipped.
+
+    """
+    tokens = (token for token in tokenize(source, start, end)
+              if token[0] != COMMENT)
+    try:
+        if next(tokens, (None,))[0] != OPEN:
+            return None
+        kind, start, end = next(tokens, (None, None, None))
+    except LispSyntaxError:
+        return None
+    return source[start:end] if kind == ATOM else None
+
+
+def _declared_indent(definition):
+    """Return indent rule declared in definition node or None.
+
+    Declare forms are looked up after arguments list and docstring.
+
+    """
+    for node in definition.children[3:]:
+        if isinstance(node, Atom) and node.atom[:1] == '"':
+            continue
+        if _head(node) != 'declare':
+            return None
+        for spec in node.children[1:]:
+            if _head(spec) == 'indent' and len(spec.children) == 2 and \
+               isinstance(spec.children[1], Atom):
+                value = spec.children[1].atom
+                if value.isdigit():
+                    return int(value)
+                if value == 'defun':
+                    return value
+    return None
+
+
+def indent_declarations(source):
+    """Return dict symbol -> indent rule (count of arguments or
+    'defun') of top-level definitions of source string.
+
+    Only top-level forms which head token is one of DEFINERS and which
+    text has declare symbol are parsed, forms after syntax error are
+    skipped. Symbol is looked up as a substring, so there is no need to
+    know how it is separated from open brace before it.
+
+    """
+    rules = {}
+    if 'declare' not in source:
+        return rules
+    try:
+        for kind, start, end in skim(source):
+            if kind != 'form' or \
+               'declare' not in source[start:end] or \
+               _definer(source, start, end) not in DEFINERS:
+                continue
+            try:
+                definition = parse(source[start:end])[0]
+            except LispSyntaxError:
+                continue
+            if _head(definition) not in DEFINERS or \
+               len(definition.children) < 4 or \
+               not isinstance(definition.children[1], Atom):
+                continue
+            rule = _declared_indent(definition)
+            if rule is not None:
+                rules[definition.children[1].atom] = rule
+    except LispSyntaxError:
+        pass
+    return rules
+
+
+class IndentIndex:
+    """Index of indent declarations of elisp files stored in SQLite file.
+
+    Declarations are stored by file path with its mtime and size, so
+    update scans only new and changed files. File is in WAL mode like
+    FormatCache one, so index can be shared by several processes.
+
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.scanned = 0
+        self._connection = _connect(path, timeout)
+        _transaction(
+            self._connection,
+            'CREATE TABLE IF NOT EXISTS files ('
+            'path TEXT PRIMARY KEY, mtime INTEGER NOT NULL, '
+            'size INTEGER NOT NULL, rules TEXT NOT NULL)')
+
+    def __len__(self):
+        return self._connection.execute(
+            'SELECT count(*) FROM files').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def update(self, paths):
+        """Scan new and changed files of paths, forget removed files.
+
+        Return number of scanned files.
+
+        """
+        known = {path: (mtime, size) for path, mtime, size in
+                 self._connection.execute(
+                     'SELECT path, mtime, size FROM files')}
+        changed = []
+        for path in paths:
+            path = os.path.abspath(path)
+            stat = os.stat(path)
+            if known.get(path) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            with open(path, encoding='utf-8', errors='replace') as file:
+                rules = indent_declarations(file.read())
+            changed.append((path, stat.st_mtime_ns, stat.st_size,
+                            json.dumps(rules, sort_keys=True)))
+        removed = [(path,) for path in known if not os.path.exists(path)]
+        if changed or removed:
+            def write(cursor):
+                """Write scanned files and remove missed ones."""
+                cursor.executemany(
+                    'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)',
+                    changed)
+                cursor.executemany('DELETE FROM files WHERE path = ?',
+                                   removed)
+
+            _transaction(self._connection, write)
+        self.scanned += len(changed)
+        return len(changed)
+
+    def update_tree(self, root):
+        """Scan new and changed .el files of directory root, return
+        number of scanned files."""
+        paths = []
+        for directory, directories, files in os.walk(root):
+            directories.sort()
+            paths.extend(os.path.join(directory, name)
+                         for name in sorted(files) if name.endswith('.el'))
+        return self.update(paths)
+
+    def rules(self):
+        """Return dict symbol -> indent rule of all indexed files.
+
+        If symbol is declared in several files, rule of the last file
+        path wins.
+
+        """
+        rules = {}
+        for (text,) in self._connection.execute(
+                'SELECT rules FROM files ORDER BY path'):
+            rules.update(json.loads(text))
+        return rules
+
+    def style(self, config=None):
+        """Return Style of indexed rules and rules of config object.
+
+        Config rules override indexed ones.
+
+        :raises StyleError: if config is not valid.
+
+        """
+        config = dict(config or {})
+        indent = self.rules()
+        indent.update(config.get('indent', {}))
+        config['indent'] = indent
+        return Style.from_config(config)
+
+    def close(self):
+        """Close index file."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,98 @@
+#! /usr/bin/env python3
+
+"""Layout plans of list children.
+
+Layout is a function which returns list of (prefix, offset) pairs of
+all node children, like first len(node.children) values of node
+generator (see generators module). Layouts of alignment rules are
+compiled once by compile_layout, so list children are placed by a few
+list operations instead of a generator step for each child. Layout of
+other generators is made by generator_layout.
+
+"""
+
+from itertools import islice
+
+
+class Indents(dict):
+    """Cache of new line prefixes, indents[n] is new line and n spaces."""
+
+    def __missing__(self, offset):
+        prefix = self[offset] = '\n' + ' ' * offset
+        return prefix
+
+
+# Shared new line prefixes of layouts and printers
+INDENTS = Indents()
+
+
+def compile_layout(*rules):
+    """Return layout function of rules.
+
+    Rule is a tuple (count, separator, column, by_function): next count
+    children are placed after separator ('', ' ' or '\\n', which is
+    followed by indentation) at node offset plus column, plus width of
+    node function if by_function is true. Count of the last rule is
+    ignored, it's used for all other children.
+
+    Layout is compiled to Python function without loops over rules,
+    so it takes a few operations for each rule and a list
+    multiplication for each sequence of children.
+
+    """
+    lines = ['def layout(node):',
+             '    left = len(node.children)',
+             '    if not left:',
+             '        return []',
+             '    base = node.offset',
+             '    pairs = []']
+    if any(rule[3] for rule in rules):
+        lines.append('    function = len(node.func)')
+    for i, (count, separator, column, by_function) in enumerate(rules):
+        offset = 'base + %d' % column
+        if by_function:
+            offset += ' + function'
+        if separator == '\n':
+            lines += ['    offset = ' + offset,
+                      '    pair = (indents[offset], offset)']
+        else:
+            lines.append('    pair = (%r, %s)' % (separator, offset))
+        if i == len(rules) - 1:
+            lines += ['    pairs += [pair] * left',
+                      '    return pairs']
+        elif count == 1:
+            lines += ['    pairs.append(pair)',
+                      '    if left == 1:',
+                      '        return pairs',
+                      '    left -= 1']
+        elif count:
+            lines += ['    if left <= %d:' % count,
+                      '        pairs += [pair] * left',
+                      '        return pairs',
+                      '    pairs += [pair] * %d' % count,
+                      '    left -= %d' % count]
+    namespace = {'indents': INDENTS}
+    exec('\n'.join(lines), namespace)  # pylint: disable=exec-used
+    layout = namespace['layout']
+    layout.__doc__ = 'Return (prefix, offset) pairs of node children.'
+    return layout
+
+
+def generator_layout(generator):
+    """Return layout function of generator.
+
+    It's a fallback for generators which can't be described by rules,
+    for example if offsets depend on widths of children.
+
+    """
+    def layout(node):
+        """Return (prefix, offset) pairs of node children."""
+        return list(islice(generator(node), len(node.children)))
+
+    return layout
+
+
+def layout_of(generator):
+    """Return layout of generator: compiled one from generator.layout
+    attribute or generator_layout."""
+    return getattr(generator, 'layout', None) or generator_layout(generator)
@@ -3,16 +3,145 @@
 
 """Stream specified for reading lisp syntax structures."""
 
-from .stream import Stream
+import re
+
+from .stream import Stream, MmapStream, ChunkedStream, EncodedText
 
 NOT_ATOM_CHARACTERS = frozenset((
     '\r', '\n', '\x0b', '\x0c', ' ', '\t', '(', ')', '[', ']',
     "'", ',', '`', '#', ',', '"', ';'))
 
+# Token kinds
+ATOM, STRING, COMMENT, OPEN, CLOSE, QUOTE, OPEN_VECTOR, CLOSE_VECTOR = range(8)
+TOKEN_NAMES = ('atom', 'string', 'comment', 'open', 'close', 'quote',
+               'open_vector', 'close_vector')
+
+_ATOM_CHARACTERS = r'(?:[^\r\n\x0b\x0c\ \t()\[\]\',`\#";\\]+|\\[\s\S])'
+
+TOKEN_REGEXP = re.compile(r"""
+    (?P<whitespace>[\r\n\x0b\x0c\ \t]+)
+  | (?P<open>\()
+  | (?P<close>\))
+  | (?P<open_vector>\[)
+  | (?P<close_vector>\])
+  | (?P<comment>;[^\n]*)
+  | (?P<string>"[^"\\]*(?:\\[\s\S][^"\\]*)*")
+  | (?P<unclosed_string>")
+  | (?P<quote>['`]|,@?|\#(?:'|s(?=\()|(?=[(\[])|\^\^?(?=\[)|\d+=|&\d+(?=")))
+  | (?P<char>\?(?:\\[\s\S]|[^\\])%(atom)s*)
+    (?P<unclosed_char>\\)?
+  | (?P<atom>\#\d+\#%(atom)s*|\#[\#$]%(atom)s*|\#?%(atom)s+)
+    (?P<unclosed_atom>\\)?
+  | (?P<error>[\s\S])
+""" % {'atom': _ATOM_CHARACTERS}, re.VERBOSE)
+BYTES_TOKEN_REGEXP = re.compile(
+    TOKEN_REGEXP.pattern.encode('ascii'), re.VERBOSE)
+
+# Tokens which are complete even at the end of not closed stream buffer
+_COMPLETE_TOKENS = frozenset((
+    'whitespace', 'open', 'close', 'open_vector', 'close_vector', 'string'))
+
+_TOKEN_KINDS = {
+    'whitespace': None,
+    'open': OPEN,
+    'close': CLOSE,
+    'open_vector': OPEN_VECTOR,
+    'close_vector': CLOSE_VECTOR,
+    'comment': COMMENT,
+    'string': STRING,
+    'quote': QUOTE,
+    'char': ATOM,
+    'atom': ATOM,
+}
+
 
 class LispSyntaxError(ValueError):
-    """Error for not valid lisp programms."""
-    pass
+    """Error for not valid lisp programms.
+
+    position is an offset of error in source or None, line and column
+    are set by locate.
+
+    """
+
+    def __init__(self, message, position=None):
+        super(LispSyntaxError, self).__init__(message)
+        self.message = message
+        self.position = position
+        self.line = None
+        self.column = None
+
+    def __str__(self):
+        if self.line is None:
+            return self.message
+        return '%s (line %s, column %s)' % (
+            self.message, self.line, self.column)
+
+    def locate(self, lines):
+        """Set line and column of error position using LineIndex lines.
+
+        They are not set if line of position is dropped from lines.
+
+        """
+        if self.position is not None:
+            try:
+                self.line, self.column = lines.position(self.position)
+            except ValueError:  # line is discarded by chunked stream
+                pass
+        return self
+
+
+def token_error(group, position):
+    """Return LispSyntaxError for TOKEN_REGEXP error group at position."""
+    name = 'string' if group == 'unclosed_string' else 'atom'
+    return LispSyntaxError(
+        "can't read %s at position %s" % (name, position), position)
+
+
+def tokenize(source, start=0, end=None):
+    """Generate token spans of lisp source.
+
+    Spans are triples (kind, start, end) where kind is one of ATOM,
+    STRING, COMMENT, OPEN, CLOSE, OPEN_VECTOR, CLOSE_VECTOR or QUOTE
+    (reader prefix like ', `, ,@ or #') and start, end are token bounds
+    in source. Whitespaces are skipped. Token text is not copied, use
+    token_text(source, start, end) to get it.
+
+    Source is a str or bytes-like object (bytes, bytearray, mmap) with
+    utf-8 text, for last one bounds are byte offsets. Source is scanned
+    from start to end (the end of source by default) by TOKEN_REGEXP,
+    so tokens and errors are the same as LispStream.tokens gives, but
+    without per character loops.
+
+    :raises LispSyntaxError: if source contains unclosed string, atom
+      with unclosed escape sequence or not atom character.
+
+    """
+    regexp = TOKEN_REGEXP if isinstance(source, str) else BYTES_TOKEN_REGEXP
+    end = len(source) if end is None else end
+    kinds = _TOKEN_KINDS
+    for match in regexp.finditer(source, start, end):
+        kind = kinds.get(match.lastgroup, -1)
+        if kind is None:
+            continue
+        if kind == -1:
+            raise token_error(match.lastgroup, match.start())
+        yield (kind, match.start(), match.end())
+
+
+def token_text(source, start, end):
+    """Return text of token span of source as str."""
+    text = source[start:end]
+    if isinstance(text, str):
+        return text
+    return bytes(text).decode('utf-8')
+
+
+_BRACE_KINDS = {
+    '(': OPEN,
+    ')': CLOSE,
+    '[': OPEN_VECTOR,
+    ']': CLOSE_VECTOR,
+}
 
 
 class LispStream(Stream):
@@ -59,7 +188,18 @@ class LispStream(Stream):
             return None
 
         start_state = self._state
+        if not self._skip_atom_characters():
+            self.set_state(start_state)
+            return None
 
+        return self._string[start_state:self._state]
+
+    def _skip_atom_characters(self):
+        """Skip atom characters with escaped ones.
+
+        Return False if stream ends with escape character.
+
+        """
         while (self._state < self._size and
                not self._string[self._state] in NOT_ATOM_CHARACTERS):
             if self._string[self._state] == '\\':
@@ -67,10 +207,8 @@ class LispStream(Stream):
             self._state += 1
 
         if self._state > self._size:
-            self.set_state(start_state)
-            return None
-
-        return self._string[start_state:self._state]
+            return False
+        return True
 
     def read_comment(self):
         """Try to comment atom from stream.
@@ -95,3 +233,193 @@ class LispStream(Stream):
             return None
 
         return self._string[start_state:self._state]
+
+    def tokens(self):
+        """Generate tokens of lisp program from current stream position.
+
+        Reference implementation of tokenize: token reader is selected
+        by first token character from READERS table, readers read
+        tokens character by character.
+
+        """
+        readers = self.READERS
+        read_atom = readers[None]
+        while True:
+            self.skip()
+            char = self.get(False)
+            if char is None:
+                return
+            start = self._state
+            kind = readers.get(char, read_atom)(self)
+            yield (kind, start, self._state)
+
+    def _error(self, name, start):
+        """Set state to start and raise LispSyntaxError."""
+        self._state = start
+        raise LispSyntaxError(
+            "can't read %s at position %s" % (name, start), start)
+
+    def _read_brace(self):
+        """Read brace token."""
+        char = self._string[self._state]
+        self._state += 1
+        return _BRACE_KINDS[char]
+
+    def _read_string_token(self):
+        """Read string token."""
+        start = self._state
+        if self.read_string() is None:
+            self._error('string', start)
+        return STRING
+
+    def _read_comment_token(self):
+        """Read comment token."""
+        start = self._state
+        if self.read_comment() is None:
+            self._error('comment', start)
+        return COMMENT
+
+    def _read_atom_token(self):
+        """Read atom token."""
+        start = self._state
+        if self.read_atom() is None:
+            self._error('atom', start)
+        return ATOM
+
+    def _read_quote(self):
+        """Read quote, backquote, comma or comma-at prefix token."""
+        char = self._string[self._state]
+        self._state += 1
+        if char == ',' and self.get(False) == '@':
+            self._state += 1
+        return QUOTE
+
+    def _read_character(self):
+        """Read character literal like ?a, ?\\( or ?\\C-x."""
+        start = self._state
+        if self._state + 1 >= self._size:
+            return self._read_atom_token()
+        self._state += 1
+        if self._string[self._state] == '\\':
+            self._state += 1
+        self._state += 1
+        if not self._skip_atom_characters():
+            self._error('atom', start)
+        return ATOM
+
+    def _read_hash(self):
+        """Read # reader syntax: #', #^[ and other prefixes or #...
+        atoms."""
+        start = self._state
+        string, size = self._string, self._size
+        self._state += 1
+        char = self.get(False)
+        if char == "'" or char == 's' and \
+           start + 2 < size and string[start + 2] == '(':
+            self._state += 1
+            return QUOTE
+        if char == '[' or char == '(':
+            return QUOTE
+        if char == '^':
+            end = start + 3 if string[start + 2:start + 3] == '^' \
+                else start + 2
+            if string[end:end + 1] == '[':
+                self._state = end
+                return QUOTE
+        if char is not None and (char.isdigit() or char == '&'):
+            self._state += 1
+            while self._state < size and string[self._state].isdigit():
+                self._state += 1
+            char = self.get(False)
+            if string[start + 1] == '&':
+                if char == '"' and self._state > start + 2:
+                    return QUOTE
+            elif char == '=':
+                self._state += 1
+                return QUOTE
+            elif char == '#':
+                self._state += 1
+                if not self._skip_atom_characters():
+                    self._error('atom', start)
+                return ATOM
+            self._state = start + 1
+            char = string[self._state]
+        if char == '#' or char == '$':
+            self._state += 1
+        elif char is None or char in NOT_ATOM_CHARACTERS:
+            self._error('atom', start)
+        if not self._skip_atom_characters():
+            self._error('atom', start)
+        return ATOM
+
+    READERS = {
+        '(': _read_brace,
+        ')': _read_brace,
+        '[': _read_brace,
+        ']': _read_brace,
+        '"': _read_string_token,
+        ';': _read_comment_token,
+        "'": _read_quote,
+        '`': _read_quote,
+        ',': _read_quote,
+        '#': _read_hash,
+        '?': _read_character,
+        None: _read_atom_token,
+    }
+
+
+class MmapLispStream(MmapStream, LispStream):
+    """LispStream over memory mapped file."""
+    pass
+
+
+class ChunkedLispStream(ChunkedStream, LispStream):
+    """LispStream fed by chunks of text."""
+
+    def tokens(self):
+        """Generate tokens of text fed to stream.
+
+        Buffer is scanned by TOKEN_REGEXP like tokenize does. Token
+        which can be continued by next chunk (atom, comment, unclosed
+        string) is not generated until next chunk is fed or stream is
+        closed, so unclosed string and atom errors are raised only at
+        the end of text. If stream reads file, next chunks are read
+        when buffer is exhausted, else generator stops and can be
+        started again after feed.
+
+        Text of previous tokens is discarded when buffer is exhausted.
+
+        """
+        kinds = _TOKEN_KINDS
+        while True:
+            buffer, closed = self._string, self._closed
+            for match in TOKEN_REGEXP.finditer(buffer, self._state):
+                group = match.lastgroup
+                if not closed and (
+                        group == 'unclosed_string' or
+                        match.end() == self._size and
+                        group not in _COMPLETE_TOKENS):
+                    break
+                kind = kinds.get(group, -1)
+                start = self._offset + match.start()
+                if kind == -1:
+                    raise token_error(group, start)
+                self._state = match.end()
+                if kind is not None:
+                    yield (kind, start, self._offset + self._state)
+            if closed:
+                return
+            self.discard()
+            if not self.read():
+                return
+
+
+def reference_tokens(source):
+    """Generate tokens of source with LispStream character readers.
+
+    Source is a str or bytes-like object like for tokenize.
+
+    """
+    if not isinstance(source, str):
+        source = EncodedText(source)
+    return LispStream(source).tokens()
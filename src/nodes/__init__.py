@@ -8,9 +8,10 @@ Each node responsible for it's appearance
 
 from .named_nodes import IfList, LetList, DefunList, DolistList, SetfList
 from .base import (
-    FunctionAlignList, List, FirstBraceAlignList, Atom, Comment, Program)
+    FunctionAlignList, List, FirstBraceAlignList, Vector, Atom, Comment, Quote,
+    Program, CommentTable)
 
-__all__ = ('wrap_list', 'Atom',)
+__all__ = ('wrap_list', 'Atom', 'Quote', 'Vector')
 
 NODES = {
     'and': FunctionAlignList,
@@ -27,15 +28,20 @@ NODES = {
 }
 
 
-def wrap_list(node):
+def wrap_list(node, nodes=NODES):
     """Select node wrapper for current node.
 
-    Node type is list
+    Node type is list, wrappers of named lists are taken from nodes
+    dispatch table.
 
     """
     comments = node.comments
+    if node.open_brace == '[':
+        return Vector(node, comments, node.start, node.end)
     if node:
         func = node[0]
-        default = List if func.isflat else FirstBraceAlignList
-        return NODES.get(func, default)(node, comments)
-    return List(node, comments)
+        wrapper = List if func.isflat else FirstBraceAlignList
+        if isinstance(func, Atom):  # lists are never looked up (and hashed)
+            wrapper = nodes.get(func.atom, wrapper)
+        return wrapper(node, comments, node.start, node.end)
+    return List(node, comments, node.start, node.end)
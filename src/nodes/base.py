@@ -4,10 +4,19 @@
 """Base classes ans function for nodes."""
 
 
-__all__ = ('FunctionAlignList', 'List', 'FirstBraceAlignList',
-           'Atom', 'Comment', 'Program')
-
-from src.tools import abstractmethod
+__all__ = ('FunctionAlignList', 'List', 'FirstBraceAlignList', 'Vector',
+           'Atom', 'Comment', 'Quote', 'Program', 'CommentTable')
+
+import hashlib
+import io
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from src.tools import abstractmethod, DEFAULT_OPTIONS
+from src.layout import INDENTS, layout_of
 from src.generators import (
     dummy_nested_generator, dummy_flat_generator,
     default_flat_generator, default_nested_generator,
@@ -17,11 +26,22 @@ from src.generators import (
 
 
 class Atom:
-    """Base atom class."""
+    """Base atom class.
+
+    start and end are bounds of atom in source if it was parsed. width
+    is length of atom or None if it has new lines (multiline string),
+    see first_width and last_width.
+
+    """
+    __slots__ = ('offset', 'atom', 'start', 'end', 'width', '_fingerprint')
 
-    def __init__(self, atom):
+    def __init__(self, atom, start=None, end=None):
         self.offset = 0
         self.atom = atom
+        self.start = start
+        self.end = end
+        self.width = None if '\n' in atom else len(atom)
+        self._fingerprint = None
 
     def __repr__(self):
         return 'Atom(%s)' % repr(self.atom)
@@ -44,17 +64,51 @@ class Atom:
         """Pretty form of lisp Node."""
         return str(self.atom)
 
+    def write(self, sink):
+        """Write pretty form of node to sink, see _writer."""
+        _writer(sink)(str(self.atom))
+
+    @property
+    def fingerprint(self):
+        """Structural digest of node, see _fingerprint."""
+        return self._fingerprint or _fingerprint(self)
+
     @property
     def isflat(self):
         """Atom always is flat."""
         return True
 
+    @property
+    def first_width(self):
+        """Width of the first line of atom."""
+        if self.width is not None:
+            return self.width
+        return self.atom.index('\n')
+
+    @property
+    def last_width(self):
+        """Width of the last line of atom."""
+        if self.width is not None:
+            return self.width
+        return len(self.atom) - self.atom.rindex('\n') - 1
+
 
 class Comment:
-    """Base comment class."""
+    """Base comment class.
 
-    def __init__(self, comment):
+    start and end are bounds of comment in source if it was parsed.
+
+    """
+    __slots__ = ('offset', 'start', 'end', 'comment_level', 'comment',
+                 '_fingerprint')
+    # Comment lasts to the end of line, so it has no flat width
+    width = first_width = last_width = None
+
+    def __init__(self, comment, start=None, end=None):
         self.offset = 0
+        self.start = start
+        self.end = end
+        self._fingerprint = None
         self.comment_level = 0
         for _ in comment:
             if _ == ';':
@@ -92,55 +146,323 @@ class Comment:
             return '\n%s %s' % (
                 ';' * self.comment_level, str(self.comment).capitalize(),)
 
+    def write(self, sink):
+        """Write pretty form of node to sink, see _writer."""
+        _writer(sink)(self.pprint())
+
     @property
     def isflat(self):
         """Comment always is nested."""
         return False
 
+    @property
+    def fingerprint(self):
+        """Structural digest of node, see _fingerprint."""
+        return self._fingerprint or _fingerprint(self)
+
+
+class Quote:
+    """Node with reader prefix: quote, backquote, comma, #' and others.
+
+    start and end are bounds of prefix and node in source if it was
+    parsed. width is width of prefix and node printed in one line or
+    None like for node.
+
+    """
+    __slots__ = ('offset', 'prefix', 'node', 'start', 'end', 'width',
+                 '_fingerprint')
+
+    def __init__(self, prefix, node, start=None, end=None):
+        self.offset = 0
+        self.prefix = prefix
+        self.node = node
+        self.start = start
+        self.end = end
+        width = node.width
+        self.width = None if width is None else len(prefix) + width
+        self._fingerprint = None
+
+    def __repr__(self):
+        return _repr(self)
+
+    def __len__(self):
+        prefixes, node = _unquote(self)
+        return len(''.join(prefixes)) + len(node)
+
+    def __hash__(self):
+        prefixes, node = _unquote(self)
+        return hash((tuple(prefixes), node))
+
+    def __eq__(self, other):
+        return _equal(self, other)
+
+    def pprint(self, options=None):
+        """Pretty form of lisp Node."""
+        sink = io.StringIO()
+        self.write(sink, options)
+        return sink.getvalue()
+
+    def write(self, sink, options=None):
+        """Write pretty form of node to sink, see _writer."""
+        _emit(self, _writer(sink), options)
+
+    @property
+    def isflat(self):
+        """Quote is flat if it's node is flat."""
+        return _unquote(self)[1].isflat
+
+    @property
+    def first_width(self):
+        """Width of the first line of quote printed flat or None."""
+        prefixes, node = _unquote(self)
+        width = node.first_width
+        return None if width is None else len(''.join(prefixes)) + width
+
+    @property
+    def last_width(self):
+        """Width of the last line of quote printed flat or None."""
+        node = self
+        while isinstance(node, Quote):
+            if node.width is not None:
+                return node.width
+            node = node.node
+        return node.last_width
+
+    @property
+    def fingerprint(self):
+        """Structural digest of node, see _fingerprint."""
+        return self._fingerprint or _fingerprint(self)
+
+
+def _unquote(node):
+    """Return (prefixes, node) of chain of quotes without recursion."""
+    prefixes = []
+    while isinstance(node, Quote):
+        prefixes.append(node.prefix)
+        node = node.node
+    return prefixes, node
+
+
+class CommentTable:
+    """Side table of comments of one parsed source.
+
+    comments are Comment nodes and places are indexes of children they
+    precede in their lists (len(children) for comments after the last
+    child). Comments of every list are stored in one contiguous range,
+    list keeps only Comments view of it, so lists without comments
+    store nothing.
+
+    """
+    __slots__ = ('comments', 'places')
+
+    def __init__(self):
+        self.comments = []
+        self.places = array('q')
+
+    def __repr__(self):
+        return 'CommentTable(<%s comments>)' % len(self.comments)
+
+    def __len__(self):
+        return len(self.comments)
+
+    def append(self, place, comment):
+        """Add comment placed before child with index place."""
+        self.places.append(place)
+        self.comments.append(comment)
+
+    def add(self, pairs):
+        """Add (place, comment) pairs of one list ordered by place, return
+        Comments view of them (NO_COMMENTS if there are no pairs)."""
+        first = len(self.comments)
+        for place, comment in pairs:
+            self.append(place, comment)
+        return self.view(first)
+
+    def view(self, first=0, stop=None):
+        """Return Comments view of table range (NO_COMMENTS if it's
+        empty)."""
+        stop = len(self.comments) if stop is None else stop
+        return Comments(self, first, stop) if stop > first else NO_COMMENTS
+
+
+class Comments(Mapping):
+    """Comments of list: read-only view of range of CommentTable which
+    maps child index to list of comments placed before it."""
+    __slots__ = ('table', 'first', 'stop')
+
+    def __init__(self, table, first, stop):
+        self.table = table
+        self.first = first
+        self.stop = stop
+
+    def __repr__(self):
+        return 'Comments(%r)' % dict(self.items())
+
+    def _bounds(self, place):
+        """Return table range of comments at place."""
+        places = self.table.places
+        first = bisect_left(places, place, self.first, self.stop)
+        return first, bisect_right(places, place, first, self.stop)
+
+    def __getitem__(self, place):
+        first, stop = self._bounds(place)
+        if first == stop:
+            raise KeyError(place)
+        return self.table.comments[first:stop]
+
+    def __contains__(self, place):
+        first, stop = self._bounds(place)
+        return first != stop
+
+    def __iter__(self):
+        places = self.table.places
+        previous = None
+        for i in range(self.first, self.stop):
+            if places[i] != previous:
+                previous = places[i]
+                yield previous
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __bool__(self):
+        return self.stop > self.first
+
+    def items(self):
+        places, comments = self.table.places, self.table.comments
+        first = self.first
+        for i in range(self.first + 1, self.stop + 1):
+            if i == self.stop or places[i] != places[first]:
+                yield (places[first], comments[first:i])
+                first = i
+
+    def values(self):
+        for _, comments in self.items():
+            yield comments
+
+
+# Comments of lists without comments
+NO_COMMENTS = MappingProxyType({})
+
+
+def _comments(comments):
+    """Return Comments of dict mapping child index to comments."""
+    if isinstance(comments, Comments) or not comments:
+        return comments or NO_COMMENTS
+    return CommentTable().add(
+        (place, comment) for place, line in sorted(comments.items())
+        for comment in line)
+
 
 class BaseList:
-    """Base list class."""
+    """Base list class.
+
+    start and end are bounds of list in source if it was parsed.
+    Children list is adopted, not copied. Comments map child index to
+    comments before it (index len(children) to comments after the last
+    child). They are a Comments view of CommentTable of the parsed
+    source (dict given to constructor is copied to a new table), lists
+    without comments share empty NO_COMMENTS.
+
+    width is width of list printed in one line by flat_generator. It's
+    None if list has multiline strings, then first_width and last_width
+    are widths of the first and the last lines, all of them are None if
+    list can't be printed in one line: it has comments or it's
+    flat_generator is not default_flat_generator (named lists like let).
+    Widths are computed from widths of children when list is created,
+    so they are known for every node of parsed tree.
+
+    """
+    __slots__ = ('offset', 'start', 'end', 'children', 'func', 'comments',
+                 'nested', 'width', 'first_width', 'last_width',
+                 '_fingerprint')
     node_name = 'BaseList'
+    open_brace = '('
+    close_brace = ')'
 
-    def __init__(self, children, comments=None):
+    def __init__(self, children, comments=None, start=None, end=None):
         self.offset = 0
-        self.children = list(children)
+        self.start = start
+        self.end = end
+        self.children = children = children if isinstance(children, list) \
+            else list(children)
         self.func = None if len(children) == 0 else children[0]
-        self.comments = comments or dict()
-
-        self.nested = False
-        for _ in self.children:
-            if not _.isflat:
-                self.nested = True
-                break
-        if not self.nested:
-            for comments in self.comments.values():
+        self.comments = comments = _comments(comments)
+        self._fingerprint = None
+
+        nested = False
+        line = first = None
+        if not comments and \
+           type(self).flat_generator is default_flat_generator:
+            line = len(self.open_brace) - 1
+        for child in children:
+            if not nested and not child.isflat:
+                nested = True
+            if line is None:
+                if nested:
+                    break
+                continue
+            width = child.width
+            if width is not None:
+                line += width + 1
+            elif child.first_width is None:
+                line = None
+            else:
+                if first is None:
+                    first = line + child.first_width + 1
+                line = child.last_width
+        if not nested:
+            for comments in comments.values():
                 for _ in comments:
                     if not _.isflat:
-                        self.nested = True
+                        nested = True
                         break
-        if not self.nested:
-            self.generator = self.flat_generator
+        self.nested = nested
+
+        if line is not None:
+            line += len(self.close_brace) + (not children)
+        if first is None or line is None:
+            self.width = self.first_width = self.last_width = line
         else:
-            self.generator = self.nested_generator
+            self.width = None
+            self.first_width = first
+            self.last_width = line
 
     def __repr__(self):
-        return '%s(%s)' % (
-            str(self.node_name), (', '.join(repr(_) for _ in self.children)))
+        return _repr(self)
 
     def __len__(self):
         return len(self.children)
 
+    def generator(self):
+        """Return nested_generator or flat_generator of list."""
+        if self.nested:
+            return self.nested_generator()
+        return self.flat_generator()
+
+    def layout(self):
+        """Return (prefix, offset) pairs of children by nested_layout or
+        flat_layout of list."""
+        if self.nested:
+            return self.nested_layout()
+        return self.flat_layout()
+
+    def __init_subclass__(cls, **kwargs):
+        """Set layouts of generators if class doesn't declare them."""
+        super(BaseList, cls).__init_subclass__(**kwargs)
+        if 'flat_layout' not in cls.__dict__:
+            cls.flat_layout = layout_of(cls.flat_generator)
+        if 'nested_layout' not in cls.__dict__:
+            cls.nested_layout = layout_of(cls.nested_generator)
+
     def __getitem__(self, k):
         return self.children[k]
 
     def __eq__(self, other):
-        if isinstance(other, BaseList):
-            return self.children == other.children
-        return self.children == list(other)
+        return _equal(self, other)
 
     def __hash__(self):
-        return hash(repr(self.children))
+        return int.from_bytes(self.fingerprint[:8], 'little', signed=True)
 
     def __iter__(self):
         return iter(self.children)
@@ -154,51 +476,58 @@ class BaseList:
         """
         return not self.children
 
+    @property
+    def fingerprint(self):
+        """Structural digest of node, see _fingerprint."""
+        return self._fingerprint or _fingerprint(self)
+
+    def rewrap(self, cls):
+        """Return list of class cls with the same children and comments.
+
+        If cls prints list in one line the same way, widths, nested flag
+        and fingerprint are copied instead of computing them again.
+
+        """
+        if cls.flat_generator is not type(self).flat_generator or \
+           cls.open_brace != self.open_brace or \
+           cls.close_brace != self.close_brace:
+            return cls(self.children, self.comments, self.start, self.end)
+        node = cls.__new__(cls)
+        for name in BaseList.__slots__:
+            setattr(node, name, getattr(self, name))
+        return node
+
     @abstractmethod
     def pprint(self):
         """Pretty form of lisp Node."""
         pass
 
+    @abstractmethod
+    def write(self, sink):
+        """Write pretty form of node to sink, see _writer."""
+        pass
+
     flat_generator = dummy_flat_generator
     nested_generator = dummy_nested_generator
+    flat_layout = layout_of(dummy_flat_generator)
+    nested_layout = layout_of(dummy_nested_generator)
 
 # Specialized list classes
 
 
 class List(BaseList):
     """Default class for usual list, base class for named lists."""
+    __slots__ = ()
     node_name = 'List'
 
-    def pprint(self):
-        generator = zip(self.generator(), self.children,
-                        range(len(self.children) + 1))
+    def pprint(self, options=None):
+        sink = io.StringIO()
+        self.write(sink, options)
+        return sink.getvalue()
 
-        result = []
-
-        # first node
-        # try:
-        #     (prefix, offset), node, i = next(generator)
-        #     node.offset = offset
-        #     if i in self.comments:
-        #         for comment in self.comments[i]:
-        #             comment.offset = offset
-        #             result.append(comment.pprint())
-        #     result.extend((prefix, node.pprint()))
-        # except StopIteration:
-            
-
-        # another nodes
-        for (prefix, offset), node, i in generator:
-            node.offset = offset
-            if i in self.comments:
-                for comment in self.comments[i]:
-                    comment.offset = offset
-                    result.append(comment.pprint())
-            result.extend((prefix, node.pprint()))
-
-        # end comment
-        
-        return '(%s)' % ''.join(result)
+    def write(self, sink, options=None):
+        """Write pretty form of node to sink, see _writer."""
+        _emit(self, _writer(sink), options)
 
     flat_generator = default_flat_generator
     nested_generator = default_nested_generator
@@ -209,6 +538,7 @@ def generate_node_class(node_name, flat_generator=None, nested_generator=None):
 
     class NewClass(List):
         __doc__ = "{node_name} object."
+        __slots__ = ()
 
         node_name = node_name
 
@@ -228,6 +558,7 @@ def generate_node_class(node_name, flat_generator=None, nested_generator=None):
                 (List,),
                 {
                     '__doc__': '%s object.' % str(node_name),
+                    '__slots__': (),
                     'flat_generator': flat_generator,
                     'nested_generator': nested_generator
                 })
@@ -235,47 +566,143 @@ def generate_node_class(node_name, flat_generator=None, nested_generator=None):
 
 class FirstBraceAlignList(List):
     """Node wrapper for first brace aligned lists."""
+    __slots__ = ()
     node_name = 'FirstBraceAlignList'
     nested_generator = first_brace_align_generator
 
 
 class FunctionAlignList(List):
     """Node wrapper for function aligned lists."""
+    __slots__ = ()
     node_name = 'FunctionAlignList'
     nested_generator = function_align_generator
 
 
+class Vector(List):
+    """Node wrapper for vectors."""
+    __slots__ = ()
+    node_name = 'Vector'
+    open_brace = '['
+    close_brace = ']'
+    nested_generator = first_brace_align_generator
+
+
 class Program(BaseList):
-    """Programm."""
+    """Programm.
+
+    source is an object program was parsed from (Stream or TokenTable)
+    or None.
+
+    """
+    __slots__ = ('source',)
     node_name = 'Programm'
 
-    def pprint(self):
-        generator = zip(self.generator(), self.children,
-                        range(len(self.children) + 1))
-        result = []
+    def __init__(self, children, comments=None, start=None, end=None,
+                 source=None):
+        super(Program, self).__init__(children, comments, start, end)
+        self.source = source
 
-        # first node
-        (prefix, offset), node, i = next(generator)
-        node.offset = offset
-        if i in self.comments:
-            for comment in self.comments[i]:
-                comment.offset = offset
-                result.append(comment.pprint())
-        result.extend((prefix, node.pprint()))
-
-        # another nodes
-        for (prefix, offset), node, i in generator:
-            node.offset = offset
-            if i in self.comments:
-                for comment in self.comments[i]:
-                    comment.offset = offset
-                    result.append(comment.pprint())
-            result.extend((prefix, node.pprint()))
-
-        # end comments
+    @property
+    def lines(self):
+        """LineIndex of program source."""
+        return self.source.lines
+
+    def location(self, node):
+        """Return ((line, column), (line, column)) of node bounds."""
+        lines = self.source.lines
+        return (lines.position(node.start), lines.position(node.end))
 
+    def get_span(self, k):
+        """Return (start, end) of k-th top-level form."""
+        node = self.children[k]
+        return (node.start, node.end)
+
+    def pprint(self, cache=None, options=None):
+        """Pretty form of lisp Node.
+
+        If cache (FormatCache) is given, formatted top-level forms are
+        taken from it by their source text, only missed ones are
+        formatted and added to cache, so it should be created with the
+        same options.
+
+        """
+        sink = io.StringIO()
+        self.write(sink, cache, options)
+        return sink.getvalue()
+
+    def write(self, sink, cache=None, options=None):
+        """Write pretty form of program to sink form by form.
+
+        Sink and cache are the same as for _writer and pprint, so text
+        of the whole program is never kept in memory.
+
+        """
+        write = _writer(sink)
+        for k, offset, text in self.parts():
+            write(text)
+            if k is not None:
+                self._write_form(k, offset, write, cache, options)
+        if cache is not None:
+            cache.commit()
+
+    def parts(self):
+        """Generate (k, offset, text) for top-level forms: text printed
+        before k-th form (comments and separator) and offset of form.
+
+        The last part is (None, 0, text) with comments after forms.
+
+        """
+        comments = self.comments or None
+        empty = True
+        for (prefix, offset), k in zip(self.layout(),
+                                       range(len(self.children))):
+            if comments is not None and k in comments:
+                text = _pprint_comments(comments[k], offset)
+                if prefix[:1] != '\n':
+                    prefix = INDENTS[offset]
+                prefix = (text.lstrip() if empty else text) + prefix
+            yield (k, offset, prefix)
+            empty = False
+
+        text = ''
+        if comments is not None and len(self.children) in comments:
+            text = _pprint_comments(comments[len(self.children)], 0)
+            if empty:
+                text = text.lstrip()
+        yield (None, 0, text)
+
+    def format_form(self, k, offset, cache=None, options=None):
+        """Return pretty form of k-th top-level form at offset."""
+        result = []
+        self._write_form(k, offset, result.append, cache, options)
         return ''.join(result)
 
+    def _write_form(self, k, offset, write, cache, options):
+        """Write pretty form of k-th top-level form using cache."""
+        source = None
+        if cache is not None and self.source is not None:
+            start, end = self.get_span(k)
+            if start is not None:
+                try:
+                    source = self.source.get_slice(start, end)
+                except ValueError:  # text is discarded by chunked stream
+                    pass
+        if source is not None:
+            text = cache.get(source)
+            if text is None:
+                node = self.children[k]
+                node.offset = offset
+                result = []
+                _emit(node, result.append, options, self.source)
+                text = ''.join(result)
+                cache.put(source, text)
+            write(text)
+            return
+
+        node = self.children[k]
+        node.offset = offset
+        _emit(node, write, options, self.source)
+
     def flat_generator(self):
         yield ('', 0)
         value = ('\n', 0)
@@ -284,3 +711,449 @@ class Program(BaseList):
         yield ('', 0)
 
     nested_generator = flat_generator
+
+
+# Tree walkers. Nodes are visited with explicit stacks instead of
+# recursive pprint, __eq__ and __repr__ calls, so depth of nodes is not
+# limited by Python recursion limit.
+
+
+# Number of fragments _emit collects before writing them
+CHUNK_FRAGMENTS = 4096
+
+# Text of list printed in one line has no whitespace except single
+# spaces between children, so it has none of these parts. They are
+# looked up in the whole text, so lists with strings and character
+# literals containing them are not copied by _emit.
+_NOT_FLAT_PARTS = ('  ', '( ', '[ ', ' )', ' ]', "' ", '` ', ', ', '@ ')
+# Finds reader labels like #1= followed by whitespace
+_LABEL_SPACE_REGEXP = re.compile(r'#\d+=\s')
+
+
+def _writer(sink):
+    """Return function writing text to sink.
+
+    Sink is a writable text stream (file, socket file, io.StringIO) or
+    a function called with every chunk of text.
+
+    """
+    return getattr(sink, 'write', sink)
+
+
+def _flat_source(get_slice, node):
+    """Return source text of list node if it's the same as node printed
+    in one line by default_flat_generator, else None.
+
+    Children of printed node are separated by single spaces. Source
+    text of node with the same children has the same length only if it
+    has no other whitespace or some children are not separated and
+    there are extra spaces: new lines and tabs (text is not printable),
+    runs of spaces or spaces after open braces and reader prefixes and
+    before close braces (see _NOT_FLAT_PARTS). So they are checked by
+    a few substring lookups instead of visiting children.
+
+    """
+    if node.start is None:
+        return None
+    try:
+        text = get_slice(node.start, node.end)
+    except ValueError:  # text is discarded by chunked stream
+        return None
+    if len(text) != node.width or not text.isprintable():
+        return None
+    for part in _NOT_FLAT_PARTS:
+        if part in text:
+            return None
+    if '#' in text and _LABEL_SPACE_REGEXP.search(text):
+        return None
+    return text
+
+
+def _emit(root, write, options=None, source=None, trailing=0):
+    """Write pretty form of root node by write function.
+
+    Lists which write is List.write and quotes are printed here,
+    children of lists are placed by their layouts (see layout module),
+    other nodes are printed by their own pprint. Fragments of text are
+    joined in chunks of CHUNK_FRAGMENTS fragments, so every character
+    is copied to chunk once whatever nesting depth is, and chunks are
+    written to write.
+
+    Lists printed in one line by default_flat_generator are printed by
+    nested_generator if they don't fit in options['line_width']
+    together with close braces after them, it's checked by widths of
+    list, so it takes constant time. If options['compact'] is true
+    nested lists which fit are printed in one line. Other lists (named
+    ones like let) always use their layout.
+
+    trailing is width of text printed after root on its last line (close
+    braces of lists root is the last child of), it's taken into account
+    like for children of root.
+
+    If source (Stream or TokenTable nodes were parsed from) is given
+    and options['copy_source'] is true, text already printed the same
+    way is copied from source. Lists printed in one line are checked by
+    _flat_source, so their children are not visited at all. Other text
+    is copied by spans: atoms, braces and reader prefixes extend the
+    current span if they start where it ends, and prefix placing child
+    by layout does if source has the same text between previous node
+    and child, i.e. child is on the same line after a single space or
+    on the next line at the column of layout offset. So a list already
+    formatted in many lines is written as one slice of source, and
+    text between spans is printed as usual.
+
+    """
+    options = DEFAULT_OPTIONS if options is None else options
+    line_width = options['line_width']
+    compact = options.get('compact', False)
+    get_slice = source.get_slice if source is not None and \
+        options.get('copy_source', True) else None
+    if get_slice is not None and root.start is not None:
+        try:
+            get_slice(root.start, root.start)
+        except ValueError:  # text is discarded by chunked stream
+            get_slice = None
+    atom_write, list_write, quote_write = Atom.write, List.write, Quote.write
+    result = []
+    append, clear, join = result.append, result.clear, ''.join
+    # Source text from start to cursor is printed after result, it's
+    # not copied yet. cursor is None if printed text doesn't end with
+    # source text.
+    start = cursor = None
+    # Column after the last printed child, it's used instead of offset
+    # given by layout to the next child placed on the same line, since
+    # layout takes children printed in many lines as flat ones.
+    column = None
+    stack = []
+    push, pop = stack.append, stack.pop
+    node = root
+    while True:
+        if len(result) >= CHUNK_FRAGMENTS:
+            write(join(result))
+            clear()
+        node_write = type(node).write
+        while node_write is quote_write:
+            prefix = node.prefix
+            if get_slice is not None and node.start is not None and \
+               get_slice(node.start, node.start + len(prefix)) == prefix:
+                if cursor != node.start:
+                    if cursor is not None and cursor != start:
+                        append(get_slice(start, cursor))
+                    start = node.start
+                cursor = node.start + len(prefix)
+            else:
+                if cursor is not None and cursor != start:
+                    append(get_slice(start, cursor))
+                cursor = None
+                append(prefix)
+            node.node.offset = node.offset + len(prefix)
+            node = node.node
+            node_write = type(node).write
+        if node_write is atom_write:
+            if get_slice is not None and node.start is not None:
+                if cursor != node.start:
+                    if cursor is not None and cursor != start:
+                        append(get_slice(start, cursor))
+                    start = node.start
+                cursor = node.end
+            else:
+                append(str(node.atom))
+            column = node.offset + node.width if node.width is not None \
+                else node.last_width
+        elif node_write is list_write:
+            first = node.first_width
+            if first is None:
+                fits = None
+            elif node.width is None:  # last line starts in string
+                fits = node.offset + first <= line_width and \
+                    node.last_width + trailing <= line_width
+            else:
+                fits = node.offset + first + trailing <= line_width
+            if fits is None:
+                pairs = node.layout()
+            elif not fits:
+                pairs = node.nested_layout()
+            elif compact or not node.nested:
+                if get_slice is not None and node.width is not None and \
+                   _flat_source(get_slice, node) is not None:
+                    if cursor != node.start:
+                        if cursor is not None and cursor != start:
+                            append(get_slice(start, cursor))
+                        start = node.start
+                    cursor = node.end
+                    column = node.offset + node.width
+                    pairs = None
+                else:
+                    pairs = node.flat_layout()
+            else:
+                pairs = node.nested_layout()
+            if pairs is not None:
+                brace = node.open_brace
+                if get_slice is not None and node.start is not None and \
+                   get_slice(node.start, node.start + len(brace)) == brace:
+                    if cursor != node.start:
+                        if cursor is not None and cursor != start:
+                            append(get_slice(start, cursor))
+                        start = node.start
+                    cursor = node.start + len(brace)
+                else:
+                    if cursor is not None and cursor != start:
+                        append(get_slice(start, cursor))
+                    cursor = None
+                    append(brace)
+                children = node.children
+                push((node, node.comments or None, trailing, pairs,
+                      zip(pairs, children, range(len(children)))))
+                column = None
+        else:
+            if cursor is not None and cursor != start:
+                append(get_slice(start, cursor))
+            cursor = None
+            text = node.pprint()
+            append(text)
+            column = node.offset + len(text) if '\n' not in text \
+                else len(text) - text.rindex('\n') - 1
+
+        while stack:
+            parent, comments, trailing, pairs, places = stack[-1]
+            for (prefix, offset), node, i in places:
+                if comments is not None and i in comments:
+                    if cursor is not None and cursor != start:
+                        append(get_slice(start, cursor))
+                    cursor = None
+                    append(_pprint_comments(comments[i], offset))
+                    if prefix[:1] != '\n':
+                        prefix = INDENTS[offset]
+                if column is not None:  # previous child is printed
+                    if prefix[:1] != '\n':
+                        offset = column + len(prefix)
+                    column = None
+                node.offset = offset
+                if cursor is not None and node.start is not None and \
+                   node.start - cursor == len(prefix) and \
+                   (not prefix or get_slice(cursor, node.start) == prefix):
+                    cursor = node.start
+                else:
+                    if cursor is not None and cursor != start:
+                        append(get_slice(start, cursor))
+                    cursor = None
+                    append(prefix)
+                if type(node).write is not atom_write:
+                    trailing = _line_rest(parent, comments, pairs, i + 1,
+                                          trailing, compact, line_width)
+                    break
+                if get_slice is not None and node.start is not None:
+                    if cursor != node.start:
+                        start = node.start
+                    cursor = node.end
+                else:
+                    append(str(node.atom))
+            else:
+                children = parent.children
+                if comments is not None and len(children) in comments:
+                    if cursor is not None and cursor != start:
+                        append(get_slice(start, cursor))
+                    cursor = None
+                    offset = children[-1].offset if children \
+                        else parent.offset + 1
+                    append(_pprint_comments(comments[len(children)], offset))
+                    append(INDENTS[offset])
+                    column = offset
+                elif not children:
+                    column = parent.offset + len(parent.open_brace)
+                elif type(children[-1]).write is atom_write:
+                    node = children[-1]
+                    column = node.offset + node.width \
+                        if node.width is not None else node.last_width
+                brace = parent.close_brace
+                stop = None if parent.end is None or get_slice is None \
+                    else parent.end - len(brace)
+                if stop is not None and get_slice(stop, parent.end) == brace:
+                    if cursor != stop:
+                        if cursor is not None and cursor != start:
+                            append(get_slice(start, cursor))
+                        start = stop
+                    cursor = parent.end
+                else:
+                    if cursor is not None and cursor != start:
+                        append(get_slice(start, cursor))
+                    cursor = None
+                    append(brace)
+                column += len(brace)
+                pop()
+                continue
+            break
+        else:
+            if cursor is not None and cursor != start:
+                append(get_slice(start, cursor))
+            if result:
+                write(join(result))
+            return
+
+
+def _line_rest(parent, comments, pairs, first, trailing, compact, limit):
+    """Return width of text printed after child first - 1 of parent on
+    its last line, see _emit.
+
+    It's children placed on the same line by pairs (first line of the
+    child which is printed in many lines), close brace and trailing if
+    all children are on the line. Siblings are looked up until width is
+    more than limit, so it takes time bounded by line width.
+
+    """
+    children = parent.children
+    width = 0
+    for i in range(first, len(children)):
+        prefix = pairs[i][0]
+        if prefix[:1] == '\n' or comments is not None and i in comments or \
+           width > limit:
+            return width
+        width += len(prefix)
+        node = children[i]
+        while isinstance(node, Quote):
+            node = node.node
+        if not compact and isinstance(node, BaseList) and node.nested:
+            return width  # printed in many lines from open brace
+        if children[i].width is None:
+            line = children[i].first_width
+            return width if line is None else width + line
+        width += children[i].width
+    if comments is not None and len(children) in comments:
+        return width
+    return width + len(parent.close_brace) + trailing
+
+
+def _pprint_comments(comments, offset):
+    """Return pretty form of comments placed at offset.
+
+    Comment lasts to the end of line, so caller starts next node or
+    close brace from new line.
+
+    """
+    result = []
+    for comment in comments:
+        comment.offset = offset
+        text = comment.pprint()
+        if result and text[:1] != '\n':  # previous comment lasts to eol
+            text = '\n%s%s' % (' ' * offset, text.lstrip())
+        result.append(text)
+    return ''.join(result)
+
+
+def _equal(first, second):
+    """Compare nodes like __eq__ of lists and quotes does.
+
+    Lists and quotes are equal to other ones if they have the same
+    fingerprint, to Python lists and (prefix, node) tuples if their
+    items are equal.
+
+    """
+    stack = [(first, second)]
+    pop, extend = stack.pop, stack.extend
+    while stack:
+        first, second = pop()
+        if first is second:
+            continue
+        if isinstance(first, (BaseList, Quote)) and \
+           isinstance(second, (BaseList, Quote)):
+            if first.fingerprint != second.fingerprint:
+                return False
+        elif isinstance(first, BaseList):
+            first = first.children
+            if isinstance(second, BaseList):
+                second = second.children
+            else:
+                second = list(second)
+            if len(first) != len(second):
+                return False
+            extend(zip(reversed(first), reversed(second)))
+        elif isinstance(first, Quote):
+            if isinstance(second, Quote):
+                prefix, second = second.prefix, second.node
+            elif isinstance(second, tuple) and len(second) == 2:
+                prefix, second = second
+            else:
+                return False
+            if first.prefix != prefix:
+                return False
+            stack.append((first.node, second))
+        elif first != second:
+            return False
+    return True
+
+
+def _fingerprint(root):
+    """Set fingerprints of root and it's subnodes, return root one.
+
+    Fingerprint is 16 bytes blake2b digest of node kind, text (of atom,
+    comment, quote prefix or list brace) and fingerprints of subnodes
+    and comments with their positions. It doesn't depend on node
+    bounds and is the same in any process, so it can be used as a key of
+    persistent caches. Fingerprints are computed bottom-up once and
+    kept by nodes, so nodes shouldn't be changed after that.
+
+    """
+    stack = [root]
+    while stack:
+        node = stack[-1]
+        if node._fingerprint is not None:
+            stack.pop()
+            continue
+        if isinstance(node, Atom):
+            data = b'a' + str(node.atom).encode('utf-8')
+        elif isinstance(node, Comment):
+            data = b'c%d;' % node.comment_level + node.comment.encode('utf-8')
+        elif isinstance(node, Quote):
+            if node.node._fingerprint is None:
+                stack.append(node.node)
+                continue
+            data = b"'" + node.prefix.encode('utf-8') + b' ' + \
+                node.node._fingerprint
+        else:
+            children = list(node.children)
+            comments = sorted(node.comments.items())
+            missing = [child for child in children
+                       if child._fingerprint is None]
+            for _, line in comments:
+                missing.extend(_ for _ in line if _._fingerprint is None)
+            if missing:
+                stack.extend(missing)
+                continue
+            data = [b'(%s%d ' % (node.open_brace.encode('utf-8'),
+                                 len(children))]
+            data.extend(child._fingerprint for child in children)
+            for i, line in comments:
+                data.append(b';%d ' % i)
+                data.extend(comment._fingerprint for comment in line)
+            data = b''.join(data)
+        node._fingerprint = hashlib.blake2b(data, digest_size=16).digest()
+        stack.pop()
+    return root._fingerprint
+
+
+def _repr(root):
+    """Return repr of node like __repr__ of lists and quotes does."""
+    list_repr, quote_repr = BaseList.__repr__, Quote.__repr__
+    result = []
+    append = result.append
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if type(node) is tuple:  # text
+            append(node[0])
+        elif type(node).__repr__ is list_repr:
+            append('%s(' % str(node.node_name))
+            stack.append((')',))
+            children = list(node.children)
+            for i in range(len(children) - 1, 0, -1):
+                stack.append(children[i])
+                stack.append((', ',))
+            if children:
+                stack.append(children[0])
+        elif type(node).__repr__ is quote_repr:
+            append('Quote(%s, ' % repr(node.prefix))
+            stack.append((')',))
+            stack.append(node.node)
+        else:
+            append(repr(node))
+    return ''.join(result)
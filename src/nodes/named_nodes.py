@@ -5,28 +5,42 @@
 """Specified nodes."""
 
 from src.generators import function_align_generator_1, function_align_generator_2
-from .base import List, FirstBraceAlignList, generate_node_class
+from .base import (
+    BaseList, List, FirstBraceAlignList, Vector, generate_node_class)
+
+
+def _column_after(node, offset):
+    """Return column after node printed flat at offset.
+
+    Last line of node with multiline string starts at column 0, node
+    which can't be printed flat (it has comments) is taken as empty.
+
+    """
+    if node.width is not None:
+        return offset + node.width
+    if node.first_width is not None:
+        return node.last_width
+    return offset
 
 
 class LetList(List):
     """Let object."""
+    __slots__ = ()
     node_name = 'LetList'
 
     def __init__(self, children, *args, **kargs):
         super(LetList, self).__init__(children, *args, **kargs)
-        self.children[1] = FirstBraceAlignList(self.children[1])
-        self.generator = self.flat_generator
+        if len(self.children) > 1 and \
+           isinstance(self.children[1], BaseList) and \
+           not isinstance(self.children[1], Vector):
+            self.children[1] = self.children[1].rewrap(FirstBraceAlignList)
 
-    flat_generator = function_align_generator_1
+    flat_generator = nested_generator = function_align_generator_1
 
 
 class DefunList(List):
     """Defun object."""
-
-    def __init__(self, children, *args, **kargs):
-        super(DefunList, self).__init__(children, *args, **kargs)
-        self.generator = self.flat_generator
-
+    __slots__ = ()
     node_name = 'DefunList'
 
     def flat_generator(self):
@@ -39,23 +53,21 @@ class DefunList(List):
 
         """
         yield ('', self.offset + 1)
-        offset = self.offset + len(self.func) + 2
+        offset = _column_after(self.func, self.offset + 1) + 1
         yield (' ', offset)
-        yield (' ', offset + len(self.children[1]) + 2)
+        yield (' ', _column_after(self.children[1], offset) + 1)
         offset = self.offset + 2
         value = ('\n' + ' ' * (self.offset + 2), offset)
         for _ in range(len(self.children) - 3):
             yield value
         yield ('', 0)
 
+    nested_generator = flat_generator
+
 
 class SetfList(List):
     """Setf object."""
-
-    def __init__(self, children, *args, **kargs):
-        super(SetfList, self).__init__(children, *args, **kargs)
-        self.generator = self.flat_generator
-
+    __slots__ = ()
     node_name = 'SetfList'
 
     def flat_generator(self):
@@ -68,17 +80,16 @@ class SetfList(List):
         +--------------------------------------------------------------+
 
         """
-        offset = self.offset + len(self.func) + 2
-        value = ('\n' + ' ' * (self.offset + 2 + len(self.func)),
-                 offset)
+        offset = _column_after(self.func, self.offset + 1) + 1
+        value = ('\n' + ' ' * offset, offset)
         yield ('', self.offset + 1)
-        yield (' ', offset)
-        yield (' ', offset + len(self.children[1]) + 1)
-        for i in range((len(self.children) - 3) // 2):
-            yield value
-            yield (' ', offset + len(self.children[1 + 2 * i]) + 1)
+        for i in range(1, len(self.children), 2):
+            yield value if i > 1 else (' ', offset)
+            yield (' ', _column_after(self.children[i], offset) + 1)
         yield value
 
+    nested_generator = flat_generator
+
 DolistList = generate_node_class(
     'Dolist',
     function_align_generator_1)
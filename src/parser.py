@@ -2,24 +2,39 @@
 
 """Parser."""
 
-from .lispstream import LispStream, LispSyntaxError
-from .nodes import Program, Atom, Comment, wrap_list
+import re
+
+from .stream import Stream, ChunkedStream
+from .lispstream import (
+    LispStream, LispSyntaxError, tokenize,
+    ATOM, STRING, COMMENT, OPEN, CLOSE, QUOTE, OPEN_VECTOR, CLOSE_VECTOR)
+from .nodes import (
+    NODES, Program, Atom, Comment, CommentTable, Quote, wrap_list)
+from .nodes.base import _emit, _pprint_comments, _writer
+from .layout import INDENTS
 
 
 class StackElement(list):
     """Wrapper for raw lisp nodes.
 
-    Can separate comments from source code.
+    Can separate comments from source code: comments is a list of
+    (place, comment) pairs created only for lists with comments, they
+    are moved to CommentTable of Stack when list is closed.
 
     """
+    __slots__ = ('comments', 'open_brace', 'close_brace', 'start', 'end',
+                 'prefixes')
 
-    def __init__(self, open_brace=None, close_brace=None):
+    def __init__(self, open_brace=None, close_brace=None, start=None):
         super(StackElement, self).__init__(self)
-        self.comments = dict()
+        self.comments = None
         self.open_brace = '(' if open_brace is None else open_brace
         self.close_brace = ')' if close_brace is None else close_brace
+        self.start = start
+        self.end = None
+        self.prefixes = None
 
-    def add(self, atom):
+    def add(self, atom, start=None, end=None):
         """Add atom to current list.
 
         Check if atom is comment. If true add comment after last current
@@ -27,77 +42,322 @@ class StackElement(list):
 
         """
         if atom and atom[0] == ';':
-            length = self.__len__()
-            if length in self.comments:
-                self.comments[length].append(Comment(atom))
-            else:
-                self.comments[length] = [Comment(atom), ]
+            self.add_comment(Comment(atom, start, end))
         else:
-            self.append(Atom(atom))
+            self.add_node(Atom(atom, start, end))
+
+    def add_comment(self, comment):
+        """Add comment after last current element."""
+        if self.comments is None:
+            self.comments = []
+        self.comments.append((self.__len__(), comment))
+
+    def add_prefix(self, prefix, start=None):
+        """Add reader prefix (quote, backquote...) of next node."""
+        if self.prefixes is None:
+            self.prefixes = []
+        self.prefixes.append((prefix, start))
+
+    def add_node(self, node):
+        """Add node at the end of list, wrap it by pending prefixes."""
+        prefixes = self.prefixes
+        while prefixes:
+            prefix, start = prefixes.pop()
+            node = Quote(prefix, node, start, node.end)
+        self.append(node)
+
+    def check_prefixes(self):
+        """Raise LispSyntaxError if some prefix has no node."""
+        if self.prefixes:
+            raise LispSyntaxError(
+                'nothing after reader prefix', self.prefixes[-1][1])
 
 
 class Stack(list):
-    """Stack class with wrappers of some default list functions."""
+    """Stack class with wrappers of some default list functions.
+
+    symbols is a table of atom texts read by parser, so every symbol is
+    stored once. comments is CommentTable of all lists. nodes is a
+    dispatch table of wrap_list (NODES by default).
+
+    """
+    __slots__ = ('symbols', 'comments', 'nodes')
 
-    def __init__(self):
+    def __init__(self, nodes=None):
         super(Stack, self).__init__()
-        self.append(StackElement())
+        self.append(StackElement(start=0))
+        self.symbols = {}
+        self.comments = CommentTable()
+        self.nodes = NODES if nodes is None else nodes
 
     @property
     def top(self):
         """Top element."""
         return self[-1]
 
-    def push_new(self):
+    def push_new(self, start=None, open_brace=None, close_brace=None):
         """Create new stack element and push it to the top."""
-        self.append(StackElement())
+        self.append(StackElement(open_brace, close_brace, start))
 
-    def pop(self):
+    def pop(self, start=None, end=None, close_brace=')'):
+        """Wrap top element closed by brace from start to end."""
         if self.__len__() <= 1:
-            raise LispSyntaxError('extra brace')
+            raise LispSyntaxError('extra brace', start)
+        if self[-1].close_brace != close_brace:
+            raise LispSyntaxError('mismatched brace', start)
+        self[-1].check_prefixes()
 
-        wrapped = wrap_list(super(Stack, self).pop())
-        self[-1].append(wrapped)
+        element = super(Stack, self).pop()
+        element.end = end
+        if element.comments is not None:
+            element.comments = self.comments.add(element.comments)
+        wrapped = wrap_list(element, self.nodes)
+        self[-1].add_node(wrapped)
         return wrapped
 
 
+# pylint: disable=unused-argument
+
+def _open_list(stack, get_slice, start, end):
+    stack.push_new(start)
+
+
+def _close_list(stack, get_slice, start, end):
+    stack.pop(start, end)
+
+
+def _open_vector(stack, get_slice, start, end):
+    stack.push_new(start, '[', ']')
+
+
+def _close_vector(stack, get_slice, start, end):
+    stack.pop(start, end, ']')
+
+
+def _add_atom(stack, get_slice, start, end):
+    stack.top.add(get_slice(start, end), start, end)
+
+
+def _add_symbol(stack, get_slice, start, end):
+    text = get_slice(start, end)
+    stack.top.add_node(Atom(stack.symbols.setdefault(text, text), start, end))
+
+
+def _add_prefix(stack, get_slice, start, end):
+    stack.top.add_prefix(get_slice(start, end), start)
+
+# pylint: enable=unused-argument
+
+TOKEN_HANDLERS = {
+    ATOM: _add_symbol,
+    STRING: _add_atom,
+    COMMENT: _add_atom,
+    OPEN: _open_list,
+    CLOSE: _close_list,
+    QUOTE: _add_prefix,
+    OPEN_VECTOR: _open_vector,
+    CLOSE_VECTOR: _close_vector,
+}
+
+
+def _build(tokens, source, nodes=None):
+    """Build Program from tokens (kind, start, end) of source.
+
+    Source gives tokens text by get_slice and LineIndex of errors by
+    lines. Lists are wrapped by nodes dispatch table (NODES by
+    default).
+
+    """
+    get_slice = source.get_slice
+    handlers = TOKEN_HANDLERS
+    stack = Stack(nodes)
+    end = 0
+    try:
+        for kind, start, end in tokens:
+            handlers[kind](stack, get_slice, start, end)
+
+        if len(stack) > 1:
+            raise LispSyntaxError('unclosed brace', stack.top.start)
+        stack.top.check_prefixes()
+    except LispSyntaxError as error:
+        raise error.locate(source.lines)
+
+    top = stack.top
+    comments = None if top.comments is None else \
+        stack.comments.add(top.comments)
+    return Program(top, comments, 0, end, source)
+
+
+def _nodes(style):
+    """Return dispatch table of style, NODES for None."""
+    return NODES if style is None else style.nodes
+
 
-def parse(string):
-    """Try to parse string and return Node object."""
-
-    stream = LispStream(string)
-    stack = Stack()
-    while stream:
-        stream.skip()
-        char = stream.get(False)
-        if char == '(':                             # create new node
-            stack.push_new()
-            stream.get()
-        elif char == ')':                           # finish current node
-            stack.pop()
-            stream.get()
-        elif char == '"':                           # create string atom
-            string = stream.read_string()
-            if string is None:
-                raise LispSyntaxError(
-                    "can't read string at position %s" % stream.get_state())
-            stack.top.add(string)
-        elif char == ';':
-            comment = stream.read_comment()
-            print('comment', comment)
-            if comment is None:
-                raise LispSyntaxError(
-                    "can't read string at position %s" % stream.get_state())
-            stack.top.add(comment)
-        else:                                       # create any another atom
-            atom = stream.read_atom()
-            if atom is None:
-                raise LispSyntaxError(
-                    "can't read atom at position %s" % stream.get_state())
-
-            stack.top.add(atom)
-
-    if len(stack) > 1:
-        raise LispSyntaxError('unclosed brace')
-
-    return Program(stack.top)
+def parse(source, tokenizer=tokenize, style=None):
+    """Try to parse source and return Node object.
+
+    :param source: lisp program string or Stream, for example
+      MmapLispStream of large file or ChunkedLispStream reading a pipe.
+    :param tokenizer: function which returns tokens (kind, start, end)
+      of stream buffer. By default it is scanned by tokenize, use
+      reference_tokens to read it character by character. Chunked
+      streams are always scanned by their own tokens method.
+    :param style: Style of lists indentation, builtin one by default.
+    :raises LispSyntaxError: if source is not valid lisp program.
+
+    """
+    stream = source if isinstance(source, Stream) else LispStream(source)
+    if isinstance(stream, ChunkedStream):
+        tokens = stream.tokens()
+    else:
+        tokens = tokenizer(stream.get_buffer())
+    return _build(tokens, stream, _nodes(style))
+
+
+def parse_table(table, first=0, stop=None, style=None):
+    """Build Program of TokenTable tokens from first to stop.
+
+    Nodes are created only for these tokens, so forms of table can be
+    read one by one, see TokenTable.forms.
+
+    """
+    return _build(table.rows(first, stop), table, _nodes(style))
+
+
+def iterforms(source, tokenizer=tokenize, style=None):
+    """Generate top-level forms of source one by one.
+
+    Items are (comments, node) where comments is a list of top-level
+    comments before node, the last item is (comments, None) with
+    comments after forms. Source, tokenizer and style are the same as
+    for parse, but forms are not collected in Program: every form is
+    dropped when the next one is built, and text of MmapStream before
+    it is released (see MmapStream.release), so memory depends only on
+    the largest form.
+
+    :raises LispSyntaxError: if source is not valid lisp program.
+
+    """
+    stream = source if isinstance(source, Stream) else LispStream(source)
+    if isinstance(stream, ChunkedStream):
+        tokens = stream.tokens()
+    else:
+        tokens = tokenizer(stream.get_buffer())
+    release = getattr(stream, 'release', None)
+    get_slice = stream.get_slice
+    handlers = TOKEN_HANDLERS
+    stack = Stack(_nodes(style))
+    top = stack.top
+    try:
+        for kind, start, end in tokens:
+            handlers[kind](stack, get_slice, start, end)
+            if top and len(stack) == 1:
+                node = top.pop()
+                comments = [comment for _, comment in top.comments or ()]
+                top.comments = None
+                stack.symbols.clear()
+                yield (comments, node)
+                if release is not None:
+                    release(end)
+
+        if len(stack) > 1:
+            raise LispSyntaxError('unclosed brace', stack.top.start)
+        top.check_prefixes()
+    except LispSyntaxError as error:
+        raise error.locate(stream.lines)
+    yield ([comment for _, comment in top.comments or ()], None)
+
+
+def write_forms(source, sink, options=None, style=None, tokenizer=tokenize):
+    """Write pretty form of source program to sink form by form.
+
+    Output is the same as parse(source).write(sink, options=options)
+    gives, but forms are read by iterforms, so neither source program
+    nor its pretty form is kept in memory whole, even for MmapStream of
+    a file larger than memory.
+
+    :raises LispSyntaxError: if source is not valid lisp program, forms
+      before error are already written.
+
+    """
+    stream = source if isinstance(source, Stream) else LispStream(source)
+    write = _writer(sink)
+    empty = True
+    for comments, node in iterforms(stream, tokenizer, style):
+        text = _pprint_comments(comments, 0) if comments else ''
+        if empty:
+            text = text.lstrip()
+        if node is None:
+            write(text)
+            return
+        write(text + INDENTS[0] if comments or not empty else text)
+        node.offset = 0
+        _emit(node, write, options, stream)
+        empty = False
+
+
+_COMMENT_LEVEL_REGEXPS = (re.compile(';*'), re.compile(b';*'))
+
+_OPEN_BRACES = {OPEN: '(', OPEN_VECTOR: '['}
+_CLOSE_BRACES = {CLOSE: '(', CLOSE_VECTOR: '['}
+
+
+def iterparse(source, tokenizer=tokenize):
+    """Generate parse events of source without building nodes.
+
+    Events are tuples:
+
+    - ('open', brace, start) -- list or vector with '(' or '[' brace
+    - ('close', start) -- end of last opened list or vector
+    - ('atom', start, end), ('string', start, end) -- atom bounds
+    - ('quote', start, end) -- reader prefix of next event
+    - ('comment', level, start, end) -- comment with level semicolons
+
+    Source and tokenizer are the same as for parse, braces are checked
+    the same way, so memory depends only on nesting depth.
+
+    :raises LispSyntaxError: if source is not valid lisp program.
+
+    """
+    stream = source if isinstance(source, Stream) else LispStream(source)
+    buffer = stream.get_buffer()
+    chunked = isinstance(stream, ChunkedStream)
+    tokens = stream.tokens() if chunked else tokenizer(buffer)
+    level = _COMMENT_LEVEL_REGEXPS[not isinstance(buffer, str)].match
+    braces = []
+    prefix = None
+    try:
+        for kind, start, end in tokens:
+            if kind == ATOM or kind == STRING:
+                prefix = None
+                yield ('atom' if kind == ATOM else 'string', start, end)
+            elif kind == COMMENT:
+                if chunked:  # buffer is changed by chunks
+                    text = stream.get_slice(start, end)
+                    count = len(text) - len(text.lstrip(';'))
+                else:
+                    count = level(buffer, start, end).end() - start
+                yield ('comment', count, start, end)
+            elif kind in _OPEN_BRACES:
+                prefix = None
+                braces.append((_OPEN_BRACES[kind], start))
+                yield ('open', _OPEN_BRACES[kind], start)
+            elif kind in _CLOSE_BRACES:
+                if prefix is not None:
+                    raise LispSyntaxError(
+                        'nothing after reader prefix', prefix)
+                if not braces:
+                    raise LispSyntaxError('extra brace', start)
+                if braces.pop()[0] != _CLOSE_BRACES[kind]:
+                    raise LispSyntaxError('mismatched brace', start)
+                yield ('close', start)
+            else:
+                if prefix is None:
+                    prefix = start
+                yield ('quote', start, end)
+        if braces:
+            raise LispSyntaxError('unclosed brace', braces[-1][1])
+        if prefix is not None:
+            raise LispSyntaxError('nothing after reader prefix', prefix)
+    except LispSyntaxError as error:
+        raise error.locate(stream.lines)
@@ -0,0 +1,238 @@
+#! /usr/bin/env python3
+
+"""Lazy reading of top-level forms."""
+
+import re
+
+from .stream import Stream
+from .lispstream import (
+    LispStream, LispSyntaxError, TOKEN_REGEXP, BYTES_TOKEN_REGEXP,
+    token_error, tokenize)
+from .parser import _build, _nodes
+from .nodes import Program, Comment, CommentTable
+
+# Skips list content: strings, comments, escapes and character literals
+# are matched as a whole, other characters are matched by long runs.
+SKIM_REGEXP = re.compile(r"""
+    [^()\[\]";\\?]+
+  | (?P<open>[(\[])
+  | (?P<close>[)\]])
+  | "[^"\\]*(?:\\[\s\S][^"\\]*)*"
+  | (?P<unclosed_string>")
+  | ;[^\n]*
+  | (?<![^\r\n\x0b\x0c\ \t()\[\]"';`,])\?(?:\\[\s\S]|[^\\])
+  | \\[\s\S]
+  | [\s\S]
+""", re.VERBOSE)
+BYTES_SKIM_REGEXP = re.compile(
+    SKIM_REGEXP.pattern.encode('ascii'), re.VERBOSE)
+
+
+def _skip_list(regexp, source, position):
+    """Return end of list which content starts at position."""
+    depth = 1
+    for match in regexp.finditer(source, position):
+        group = match.lastgroup
+        if group is None:
+            continue
+        if group == 'open':
+            depth += 1
+        elif group == 'close':
+            depth -= 1
+            if not depth:
+                return match.end()
+        else:
+            raise token_error(group, match.start())
+    return None
+
+
+def skim(source, position=0):
+    """Generate bounds of top-level forms and comments of source.
+
+    Events are ('form', start, end) and ('comment', start, end). Forms
+    content is not tokenized, it's skipped by fast bracket, string and
+    comment aware SKIM_REGEXP scan, so braces kinds inside forms are not
+    checked until form is parsed.
+
+    :param source: str or bytes-like object like for tokenize.
+    :param position: offset where skimming starts, it must be outside of
+      forms.
+    :raises LispSyntaxError: if braces are not balanced or top-level
+      tokens are not valid.
+
+    """
+    if isinstance(source, str):
+        regexp, skim_regexp = TOKEN_REGEXP, SKIM_REGEXP
+    else:
+        regexp, skim_regexp = BYTES_TOKEN_REGEXP, BYTES_SKIM_REGEXP
+    size = len(source)
+    prefix = None
+    while position < size:
+        match = regexp.match(source, position)
+        group = match.lastgroup
+        start, position = match.span()
+        if group == 'whitespace':
+            continue
+        elif group == 'comment':
+            yield ('comment', start, position)
+            continue
+        elif group == 'quote':
+            prefix = start if prefix is None else prefix
+            continue
+        elif group == 'open' or group == 'open_vector':
+            position = _skip_list(skim_regexp, source, position)
+            if position is None:
+                raise LispSyntaxError('unclosed brace', start)
+        elif group == 'close' or group == 'close_vector':
+            raise LispSyntaxError('extra brace', start)
+        elif group not in ('atom', 'char', 'string'):
+            raise token_error(group, start)
+        yield ('form', start if prefix is None else prefix, position)
+        prefix = None
+    if prefix is not None:
+        raise LispSyntaxError('nothing after reader prefix', prefix)
+
+
+class LazyChildren:
+    """Sequence of top-level forms which are skimmed and parsed lazily.
+
+    Source is skimmed only up to the accessed form (len skims it
+    whole), forms are parsed on first access.
+
+    """
+
+    def __init__(self, stream, nodes=None):
+        self._stream = stream
+        self._wrappers = nodes
+        self._events = skim(stream.get_buffer())
+        self._spans = []
+        self._nodes = []
+        self._comments = CommentTable()
+        self.end = 0
+
+    def __repr__(self):
+        return 'LazyChildren(<%s forms>)' % len(self)
+
+    def __len__(self):
+        self._skim()
+        return len(self._spans)
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[i] for i in range(*k.indices(len(self)))]
+        if k < 0:
+            k += len(self)
+        self._skim(k)
+        node = self._nodes[k]
+        if node is None:
+            start, end = self._spans[k]
+            buffer = self._stream.get_buffer()
+            try:
+                node = _build(tokenize(buffer, start, end), self._stream,
+                              self._wrappers)[0]
+            except LispSyntaxError as error:
+                raise error.locate(self._stream.lines)
+            self._nodes[k] = node
+        return node
+
+    def __iter__(self):
+        i = 0
+        while self._skim(i):
+            yield self[i]
+            i += 1
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def _skim(self, k=None):
+        """Skim source until k-th form (to the end if k is None).
+
+        Return False if there is no k-th form.
+
+        """
+        if self._events is None:
+            return k is not None and k < len(self._spans)
+        stream, spans = self._stream, self._spans
+        try:
+            while k is None or k >= len(spans):
+                kind, start, self.end = next(self._events)
+                if kind == 'form':
+                    spans.append((start, self.end))
+                    self._nodes.append(None)
+                    continue
+                self._comments.append(len(spans), Comment(
+                    stream.get_slice(start, self.end), start, self.end))
+        except StopIteration:
+            self._events = None
+            return k is not None and k < len(spans)
+        except LispSyntaxError as error:
+            self._events = None
+            raise error.locate(stream.lines)
+        return True
+
+    @property
+    def comments(self):
+        """Comments of forms skimmed so far."""
+        return self._comments.view()
+
+    def get_span(self, k):
+        """Return (start, end) of k-th form without parsing it."""
+        self._skim(k)
+        return self._spans[k]
+
+    def is_parsed(self, k):
+        """Check if k-th form was parsed."""
+        return k < len(self._nodes) and self._nodes[k] is not None
+
+    def is_skimmed(self):
+        """Check if the whole source was skimmed."""
+        return self._events is None
+
+
+class LazyProgram(Program):
+    """Program which top-level forms are skimmed and parsed only when
+    accessed.
+
+    Accessing comments or end skims the whole source.
+
+    """
+    node_name = 'LazyProgramm'
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, stream, style=None):
+        self.offset = 0
+        self.source = stream
+        self.func = None
+        self.nested = False
+        self.width = self.first_width = self.last_width = None
+        self._fingerprint = None
+        self.children = LazyChildren(stream, _nodes(style))
+        self.start = 0
+
+    def get_span(self, k):
+        """Return (start, end) of k-th top-level form without parsing it."""
+        return self.children.get_span(k)
+
+    @property
+    def comments(self):
+        """Top-level comments."""
+        self.children._skim()
+        return self.children.comments
+
+    @property
+    def end(self):
+        """End of the last top-level form or comment."""
+        self.children._skim()
+        return self.children.end
+
+
+def parse_lazy(source, style=None):
+    """Skim source and return LazyProgram of it.
+
+    :param source: lisp program string or not chunked Stream.
+    :param style: Style of lists indentation, builtin one by default.
+    :raises LispSyntaxError: when source part with error is accessed.
+
+    """
+    stream = source if isinstance(source, Stream) else LispStream(source)
+    return LazyProgram(stream, style)
@@ -2,6 +2,77 @@
 
 """Stream class."""
 
+import codecs
+import mmap
+import os
+from array import array
+from bisect import bisect_right
+
+WHITESPACE = frozenset(('\r', '\n', '\x0b', '\x0c', ' ', '\t'))
+
+
+class LineIndex:
+    """Index of line start offsets of text.
+
+    Converts offsets to (line, column) and back in O(log n). Lines are
+    numbered from 1 and columns from 0 like in Emacs. Offsets and
+    columns of bytes-like text are byte offsets.
+
+    Lines before an offset can be dropped by discard (ChunkedStream
+    drops lines of discarded text), then only positions after them are
+    converted.
+
+    """
+
+    def __init__(self, text=''):
+        self.starts = array('q', (0,))
+        self.dropped = 0
+        self.extend(text, 0)
+
+    def __repr__(self):
+        return 'LineIndex(<%s lines>)' % len(self)
+
+    def __len__(self):
+        return self.dropped + len(self.starts)
+
+    def extend(self, text, offset):
+        """Add lines of text which starts at offset of indexed text."""
+        newline = '\n' if isinstance(text, str) else b'\n'
+        starts = self.starts
+        i = text.find(newline)
+        while i != -1:
+            starts.append(offset + i + 1)
+            i = text.find(newline, i + 1)
+
+    def discard(self, offset):
+        """Drop lines which end before offset."""
+        line = bisect_right(self.starts, offset) - 1
+        if line > 0:
+            del self.starts[:line]
+            self.dropped += line
+
+    def position(self, offset):
+        """Return (line, column) of offset.
+
+        :raises ValueError: if line of offset is dropped.
+
+        """
+        line = bisect_right(self.starts, offset)
+        if not line:
+            raise ValueError('position of discarded line')
+        return (self.dropped + line, offset - self.starts[line - 1])
+
+    def offset(self, line, column=0):
+        """Return offset of column of line.
+
+        :raises IndexError: if there is no such line or it's dropped.
+
+        """
+        line -= self.dropped
+        if line < 1:
+            raise IndexError('line number out of range')
+        return self.starts[line - 1] + column
+
 
 class Stream:
     """Stream."""
@@ -10,6 +81,7 @@ class Stream:
         self._string = string
         self._size = len(string)
         self._state = 0
+        self._lines = None
 
     def __repr__(self):
         return '[%s; %s:%s]' % (repr(self._string), self._state, self._size)
@@ -33,6 +105,17 @@ class Stream:
             self._state += 1
         return char
 
+    @property
+    def lines(self):
+        """LineIndex of stream text, it's built on first access."""
+        if self._lines is None:
+            self._lines = LineIndex(self.get_buffer())
+        return self._lines
+
+    def get_buffer(self):
+        """Return source which stream reads, it can be scanned by tokenize."""
+        return self._string
+
     def get_slice(self, start, stop=None):
         """Return slice of stream string from start to stop (without stop
         element).
@@ -44,17 +127,19 @@ class Stream:
             return self._string[start:stop]
         return self._string[start:]
 
-    def skip(self, characters={'\r', '\n', '\x0b', '\x0c', ' ', '\t'}.copy()):
+    def skip(self, characters=WHITESPACE):
         """Skip symbols from iterable object characters."""
 
-        characters = set(characters)
+        if not isinstance(characters, (set, frozenset)):
+            characters = frozenset(characters)
         while self._state < self._size and self._string[self._state] in characters:
             self._state += 1
 
-    def skipnot(self, characters={'\r', '\n', '\x0b', '\x0c', ' ', '\t'}.copy()):
+    def skipnot(self, characters=WHITESPACE):
         """Skip symbols that not in iterable object."""
 
-        characters = set(characters)
+        if not isinstance(characters, (set, frozenset)):
+            characters = frozenset(characters)
         while (self._state < self._size and
                self._string[self._state] not in characters):
             self._state += 1
@@ -87,3 +172,180 @@ class Stream:
     def get_full_size(self):
         """Return strings of stream size."""
         return self._size
+
+
+class EncodedText:
+    """Read only str-like view of encoded bytes-like object.
+
+    Index is a byte offset. Single character is decoded as latin-1, so
+    ascii characters are kept and bytes of multibyte characters turn to
+    characters which are not lisp delimiters. Slice is decoded with
+    encoding.
+
+    """
+
+    def __init__(self, buffer, encoding='utf-8'):
+        self.buffer = buffer
+        self.encoding = encoding
+
+    def __repr__(self):
+        return 'EncodedText(<%s bytes>, %s)' % (len(self.buffer),
+                                                repr(self.encoding))
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return bytes(self.buffer[key]).decode(self.encoding)
+        return chr(self.buffer[key])
+
+
+class MmapStream(Stream):
+    """Stream over memory mapped file.
+
+    File is not read and decoded at once, only slices given by
+    get_slice are decoded. Stream states are byte offsets.
+
+    """
+
+    def __init__(self, path, encoding='utf-8'):
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size:
+                self._mmap = mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:  # empty file can't be mapped
+                self._mmap = None
+        self._released = 0
+        super(MmapStream, self).__init__(
+            EncodedText(self._mmap or b'', encoding))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get_buffer(self):
+        """Return memory map of file."""
+        return self._string.buffer
+
+    def release(self, state):
+        """Let system drop memory pages of file text before state.
+
+        Pages are read from file again if text before state is accessed,
+        so resident memory of sequential reading doesn't grow with file
+        size.
+
+        """
+        end = state - state % mmap.PAGESIZE
+        if self._mmap is None or end <= self._released or \
+           not hasattr(mmap, 'MADV_DONTNEED'):
+            return
+        self._mmap.madvise(mmap.MADV_DONTNEED, self._released,
+                           end - self._released)
+        self._released = end
+
+    def close(self):
+        """Close memory map."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class ChunkedStream(Stream):
+    """Stream fed by chunks of text.
+
+    Chunks are appended to buffer by feed or read from file object by
+    read, close marks the end of text. Text before current state can be
+    dropped from buffer by discard, so buffer holds only part of text
+    and can't be sliced before discarded position. States are offsets
+    from start of the whole text.
+
+    """
+
+    def __init__(self, file=None, chunk_size=65536, encoding='utf-8'):
+        super(ChunkedStream, self).__init__('')
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._offset = 0
+        self._closed = False
+        self._lines = LineIndex()
+
+    @property
+    def closed(self):
+        """Check if the end of text was reached."""
+        return self._closed
+
+    def feed(self, chunk):
+        """Append chunk of str or encoded bytes to buffer."""
+        if self._closed:
+            raise ValueError('feed closed stream')
+        if not isinstance(chunk, str):
+            chunk = self._decoder.decode(chunk)
+        self._lines.extend(chunk, self._offset + self._size)
+        self._string += chunk
+        self._size = len(self._string)
+
+    def close(self):
+        """Mark the end of text."""
+        if not self._closed:
+            self.feed(self._decoder.decode(b'', True))
+            self._closed = True
+
+    def read(self):
+        """Read next chunk from file, close stream at the end of file.
+
+        Return False if stream has no file to read or it's closed.
+
+        """
+        if self._file is None or self._closed:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if chunk:
+            self.feed(chunk)
+        else:
+            self.close()
+        return True
+
+    def discard(self, state=None):
+        """Drop text before state (current state by default) from buffer."""
+        state = self.get_state() if state is None else state
+        cut = max(0, min(state - self._offset, self._state))
+        self._string = self._string[cut:]
+        self._size = len(self._string)
+        self._state -= cut
+        self._offset += cut
+        self._lines.discard(self._offset)
+
+    def get_slice(self, start, stop=None):
+        """Return slice of text from start to stop (without stop
+        element).
+
+        Raise ValueError if start is discarded.
+
+        """
+        if start < self._offset:
+            raise ValueError('slice of discarded text')
+        start -= self._offset
+        if not stop is None:
+            return self._string[start:stop - self._offset]
+        return self._string[start:]
+
+    def get_state(self):
+        """Get current stream position."""
+        return self._offset + self._state
+
+    def set_state(self, state):
+        """Set state position.
+
+        Set the first not discarded position if state is less and set
+        buffer end if state is grater.
+
+        """
+        self._state = max(0, min(state - self._offset, self._size))
+
+    def get_full_size(self):
+        """Return size of text fed to stream."""
+        return self._offset + self._size
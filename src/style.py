@@ -0,0 +1,176 @@
+#! /usr/bin/env python3
+
+"""Indentation styles of lisp forms loaded from config files.
+
+Config is a JSON object like
+
+    {"indent": {"when": 1, "defmacro": "defun", "and*": "function",
+                "my-let": "let", "progn": null}}
+
+which sets indentation rule of lists by their head symbol, like
+lisp-indent-function property in Emacs:
+
+- N -- first N arguments are aligned by the first one, others are
+  body indented (0 or null is default indentation)
+- "defun" -- indented like defun
+- "function" -- all arguments are aligned by the first one
+- other string -- indented like that symbol
+
+Rules are added to builtin ones (NODES) and compiled into dispatch
+table of node classes, which is used by parse and wrap_list.
+
+"""
+
+import hashlib
+import json
+
+from .generators import function_align_generator_f
+from .nodes import NODES, List
+from .nodes.base import generate_node_class
+
+# Version of compiled rules format, change it to change style digests
+STYLE_VERSION = 1
+
+_KEYWORDS = {
+    'defun': 'DefunList',
+    'function': 'FunctionAlignList',
+}
+
+# Node classes of compiled rules by name
+_CLASSES = {cls.__name__: cls for cls in NODES.values()}
+_CLASSES[List.__name__] = List
+
+
+class StyleError(ValueError):
+    """Error for not valid style config."""
+    pass
+
+
+def _indent_class(count):
+    """Return node class with count arguments aligned by the first one."""
+    name = 'Indent%dList' % count
+    if name not in _CLASSES:
+        _CLASSES[name] = generate_node_class(
+            'Indent%d' % count, function_align_generator_f(count))
+    return _CLASSES[name]
+
+
+def _rule(symbol, value, indent):
+    """Return compiled rule of symbol: count of aligned arguments or
+    node class name.
+
+    String values are resolved in indent rules of config and then in
+    builtin NODES.
+
+    """
+    seen = {symbol}
+    while isinstance(value, str) and value not in _KEYWORDS:
+        if value in seen:
+            raise StyleError('indent rule of %s refers to itself' % symbol)
+        seen.add(value)
+        if value in indent:
+            value = indent[value]
+        elif value in NODES:
+            return NODES[value].__name__
+        else:
+            value = None
+    if isinstance(value, str):
+        return _KEYWORDS[value]
+    if value is None or value == 0 and not isinstance(value, bool):
+        return List.__name__
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise StyleError('bad indent rule of %s: %r' % (symbol, value))
+    return value
+
+
+def compile_rules(config):
+    """Return dict symbol -> compiled rule of config object.
+
+    :raises StyleError: if config is not valid.
+
+    """
+    if not isinstance(config, dict):
+        raise StyleError('style config must be an object')
+    indent = config.get('indent', {})
+    if not isinstance(indent, dict):
+        raise StyleError('indent rules must be an object')
+    return {symbol: _rule(symbol, value, indent)
+            for symbol, value in indent.items()}
+
+
+class Style:
+    """Compiled indentation style.
+
+    nodes is a dispatch table head symbol -> node class of builtin and
+    compiled rules (dict symbol -> count of aligned arguments or node
+    class name, see compile_rules). digest identifies style in
+    FormatCache keys.
+
+    """
+
+    def __init__(self, rules=None, digest='default'):
+        self.rules = {} if rules is None else rules
+        self.digest = digest
+        self.nodes = dict(NODES)
+        for symbol, rule in self.rules.items():
+            cls = _indent_class(rule) if isinstance(rule, int) \
+                else _CLASSES[rule]
+            if cls is List:
+                self.nodes.pop(symbol, None)
+            else:
+                self.nodes[symbol] = cls
+
+    def __repr__(self):
+        return 'Style(<%s rules>)' % len(self.rules)
+
+    @classmethod
+    def from_config(cls, config):
+        """Compile config object to Style.
+
+        :raises StyleError: if config is not valid.
+
+        """
+        return cls(compile_rules(config), _digest(config))
+
+
+def _digest(config):
+    """Return digest of config object.
+
+    It's taken from canonical JSON of config, so configs which differ
+    only by formatting and key order have the same digest whether they
+    are loaded by load_style or given to Style.from_config.
+
+    """
+    text = json.dumps(config, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(
+        b'%d\0%s' % (STYLE_VERSION, text.encode('utf-8')),
+        digest_size=16).hexdigest()
+
+
+def load_config(path):
+    """Return style config object of JSON file.
+
+    :raises StyleError: if file is not valid JSON object.
+
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    try:
+        config = json.loads(data.decode('utf-8'))
+    except ValueError as error:
+        raise StyleError('bad style config %s: %s' % (path, error))
+    if not isinstance(config, dict):
+        raise StyleError('style config must be an object')
+    return config
+
+
+def load_style(path):
+    """Load Style from JSON config file.
+
+    :raises StyleError: if config is not valid.
+
+    """
+    return Style.from_config(load_config(path))
+
+
+DEFAULT_STYLE = Style()
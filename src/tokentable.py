@@ -0,0 +1,123 @@
+#! /usr/bin/env python3
+
+"""Compact table of lisp tokens."""
+
+from array import array
+
+from .stream import Stream, LineIndex
+from .lispstream import (
+    LispSyntaxError, tokenize, token_text,
+    OPEN, CLOSE, QUOTE, OPEN_VECTOR, CLOSE_VECTOR, COMMENT)
+
+_CLOSE_KINDS = {CLOSE: OPEN, CLOSE_VECTOR: OPEN_VECTOR}
+
+
+class TokenTable:
+    """Tokens of lisp source stored in parallel columns.
+
+    kinds, starts, ends and depths are array columns with token kind,
+    bounds in text and brace depth (depth of open and close tokens is
+    depth of list they belong to, so top-level braces have depth 0).
+    Bounds and depths are 64-bit, so texts over 2 GiB fit. text is the
+    buffer all tokens refer to, token text is materialized only by
+    get_text and get_slice.
+
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self._lines = None
+        self.kinds = array('i')
+        self.starts = array('q')
+        self.ends = array('q')
+        self.depths = array('q')
+
+    def __repr__(self):
+        return 'TokenTable(<%s tokens>)' % len(self.kinds)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @classmethod
+    def build(cls, source, tokenizer=tokenize):
+        """Tokenize source in one pass and return table of it's tokens.
+
+        :param source: lisp program string or not chunked Stream.
+        :raises LispSyntaxError: if source is not valid lisp program.
+
+        """
+        text = source.get_buffer() if isinstance(source, Stream) else source
+        table = cls(text)
+        kinds, starts, ends, depths = (
+            table.kinds, table.starts, table.ends, table.depths)
+        depth = 0
+        opened = []
+        try:
+            for kind, start, end in tokenizer(text):
+                if kind in _CLOSE_KINDS:
+                    depth -= 1
+                    if depth < 0:
+                        raise LispSyntaxError('extra brace', start)
+                    if opened.pop()[1] != _CLOSE_KINDS[kind]:
+                        raise LispSyntaxError('mismatched brace', start)
+                kinds.append(kind)
+                starts.append(start)
+                ends.append(end)
+                depths.append(depth)
+                if kind == OPEN or kind == OPEN_VECTOR:
+                    depth += 1
+                    opened.append((start, kind))
+            if depth:
+                raise LispSyntaxError('unclosed brace', opened[-1][0])
+        except LispSyntaxError as error:
+            raise error.locate(table.lines)
+        return table
+
+    @property
+    def lines(self):
+        """LineIndex of text, it's built on first access."""
+        if self._lines is None:
+            self._lines = LineIndex(self.text)
+        return self._lines
+
+    def token(self, i):
+        """Return (kind, start, end, depth) of i-th token."""
+        return (self.kinds[i], self.starts[i], self.ends[i], self.depths[i])
+
+    def get_text(self, i):
+        """Return text of i-th token."""
+        return token_text(self.text, self.starts[i], self.ends[i])
+
+    def get_slice(self, start, stop):
+        """Return text from start to stop (without stop element)."""
+        return token_text(self.text, start, stop)
+
+    def rows(self, first=0, stop=None):
+        """Generate (kind, start, end) of tokens from first to stop."""
+        stop = len(self.kinds) if stop is None else stop
+        return zip(self.kinds[first:stop], self.starts[first:stop],
+                   self.ends[first:stop])
+
+    def forms(self):
+        """Generate (first, stop) token ranges of top-level forms.
+
+        Reader prefixes belong to forms they precede, and so do comments
+        between prefix and its node, so ranges never overlap. Other
+        top-level comments are forms too.
+
+        """
+        kinds, depths = self.kinds, self.depths
+        first = None
+        for i, depth in enumerate(depths):
+            if depth:
+                continue
+            kind = kinds[i]
+            if kind == QUOTE or kind == OPEN or kind == OPEN_VECTOR:
+                if first is None:
+                    first = i
+            elif kind == COMMENT:
+                if first is None:
+                    yield (i, i + 1)
+            else:
+                yield (i if first is None else first, i + 1)
+                first = None
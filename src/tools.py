@@ -5,8 +5,18 @@
 PYTHON_VERSION = 3 if hasattr(list, 'copy') else 2
 DEBUG = True
 
+# Version of formatted output, change it when pprint results change to
+# invalidate FormatCache entries
+FORMAT_VERSION = 5
+
+# line_width -- lists printed in one line are broken if they are longer
+# compact -- print nested lists in one line if they fit in line_width
+# copy_source -- copy text from source where it's already printed the
+#   same way (output is the same)
 DEFAULT_OPTIONS = {
     'line_width': 80,
+    'compact': False,
+    'copy_source': True,
 }
 
 
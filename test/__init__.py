@@ -1,5 +1,15 @@
-from .test_stream import TestStream
-from .test_lispstream import TestLispStream
-from .test_parser import TestParse
+from .test_stream import (
+    TestStream, TestMmapStream, TestChunkedStream, TestLineIndex)
+from .test_lispstream import TestLispStream, TestChunkedLispStream
+from .test_parser import TestParse, TestIterparse, TestIterforms
 from .test_tools import TestTools
+from .test_tokentable import TestTokenTable
+from .test_skim import TestSkim, TestLazyProgram
+from .test_incremental import TestReparse
+from .test_cache import TestFormatCache
+from .test_layout import TestLayout
+from .test_style import TestStyle
+from .test_indexer import TestIndentIndex
+from .test_edits import TestFormatEdits
+from .test_cli import TestCli
 from .test_nodes import TestBaseNodesPprint, TestNamedNodesPprint
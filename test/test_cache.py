@@ -0,0 +1,72 @@
+#! /usr/bin/env python3
+# pylint: disable=C0111,C0103
+
+import os
+import shutil
+import tempfile
+import unittest
+from src import parse, parse_lazy, FormatCache
+
+
+class TestFormatCache(unittest.TestCase):
+
+    string = (";;; header\n(defun a (x) (let ((b 1)) (+ b x))) ; c\n"
+              "'(q [v w] ,@z)\n(setf x y)\n")
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_pprint(self):
+        expected = parse(self.string).pprint()
+        with FormatCache(self.path) as cache:
+            self.assertEqual(parse(self.string).pprint(cache), expected)
+            self.assertEqual((cache.hits, cache.misses), (0, 3))
+            self.assertEqual(len(cache), 3)
+            self.assertEqual(parse(self.string).pprint(cache), expected)
+            self.assertEqual((cache.hits, cache.misses), (3, 3))
+
+        with FormatCache(self.path) as cache:
+            program = parse_lazy(self.string)
+            self.assertEqual(program.pprint(cache), expected)
+            self.assertEqual(cache.hits, 3)
+            self.assertFalse(any(program.children.is_parsed(i)
+                                 for i in range(len(program))))
+
+    def test_key(self):
+        with FormatCache(self.path) as cache:
+            key = cache.key('(a b)')
+            self.assertEqual(key, cache.key('(a b)'))
+            self.assertNotEqual(key, cache.key('(a  b)'))
+            options = {'line_width': 100}
+            with FormatCache(self.path, options=options) as other:
+                self.assertNotEqual(key, other.key('(a b)'))
+
+    def test_eviction(self):
+        with FormatCache(self.path, max_entries=2) as cache:
+            cache.put('a', 'a')
+            cache.put('b', 'b')
+            cache.commit()
+            cache.get('a')
+            cache.put('c', 'c')
+            cache.commit()
+            self.assertEqual(len(cache), 2)
+            self.assertEqual(cache.get('a'), 'a')
+            self.assertEqual(cache.get('b'), None)
+            self.assertEqual(cache.get('c'), 'c')
+
+    def test_shared_file(self):
+        with FormatCache(self.path) as first, \
+             FormatCache(self.path) as second:
+            first.put('(a)', '(a)')
+            self.assertEqual(second.get('(a)'), None)
+            first.commit()
+            second.put('(b)', '(b)')
+            second.commit()
+            self.assertEqual(second.get('(a)'), '(a)')
+            self.assertEqual(first.get('(b)'), '(b)')
+            first.clear()
+            self.assertEqual(len(second), 0)
@@ -0,0 +1,135 @@
+#! /usr/bin/env python3
+# pylint: disable=C0111,C0103
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from src.cli import find_files, format_source, format_files, main
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.files = {
+            'a.el': '(a  b)\n', 'b.el': '(c d)\n', 'c.txt': '(e  f)',
+            'sub/d.el': '(when x\n y)', '.git/e.el': '(g  h)',
+            'sub/bad.el': '(i',
+        }
+        for name, text in self.files.items():
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as file:
+                file.write(text)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def read(self, name):
+        with open(self.path(name)) as file:
+            return file.read()
+
+    def run_main(self, *args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), \
+                contextlib.redirect_stderr(stderr):
+            status = main(list(args))
+        return status, stdout.getvalue(), stderr.getvalue()
+
+    def test_find_files(self):
+        self.assertEqual(
+            find_files([self.directory]),
+            [self.path(name) for name in
+             ('.git/e.el', 'a.el', 'b.el', 'sub/bad.el', 'sub/d.el')])
+        self.assertEqual(
+            find_files([self.directory, self.path('c.txt')],
+                       ('*.el', '*.txt'), ('.git', 'sub/bad.el', 'b.*')),
+            [self.path(name) for name in ('a.el', 'c.txt', 'sub/d.el')])
+
+    def test_format_source(self):
+        self.assertEqual(format_source('(a  b)'), '(a b)\n')
+        self.assertEqual(format_source('(a b)\n'), '(a b)\n')
+        self.assertEqual(format_source(''), '')
+        self.assertEqual(format_source('(a (b c))', options={
+            'line_width': 80, 'compact': True}), '(a (b c))\n')
+
+    def test_check_and_diff(self):
+        status, stdout, stderr = self.run_main(
+            '--check', self.directory, '--exclude', '.git')
+        self.assertEqual(status, 2)
+        self.assertEqual(stdout, '')
+        self.assertIn('would reformat %s' % self.path('a.el'), stderr)
+        self.assertIn('error: %s: unclosed brace' % self.path('sub/bad.el'),
+                      stderr)
+        self.assertNotIn('b.el', stderr)
+        status, stdout, _ = self.run_main(
+            '--diff', self.path('a.el'), self.path('b.el'))
+        self.assertEqual(status, 1)
+        self.assertIn('-(a  b)\n+(a b)\n', stdout)
+        self.assertEqual(self.read('a.el'), self.files['a.el'])
+
+    def test_write(self):
+        os.chmod(self.path('a.el'), 0o640)
+        status, _, stderr = self.run_main(
+            self.directory, '--exclude', '.git', '--exclude', 'bad.el')
+        self.assertEqual(status, 1)
+        self.assertEqual(self.read('a.el'), '(a b)\n')
+        self.assertEqual(self.read('sub/d.el'), '(when x y)\n')
+        self.assertEqual(self.read('c.txt'), self.files['c.txt'])
+        self.assertEqual(os.stat(self.path('a.el')).st_mode & 0o777, 0o640)
+        self.assertEqual(stderr.count('reformatted'), 2)
+        self.assertEqual(self.run_main('--check', self.path('a.el'))[0], 0)
+
+    def test_options(self):
+        style = self.path('style.json')
+        with open(style, 'w') as file:
+            json.dump({'indent': {'when': 1}}, file)
+        cache = self.path('cache.sqlite')
+        for _ in range(2):
+            status, stdout, _ = self.run_main(
+                '--diff', '--style', style, '--cache', cache,
+                '--line-width', '8', self.path('sub/d.el'))
+            self.assertEqual(status, 1)
+            self.assertIn(
+                '- y)\n\\ No newline at end of file\n+  y)\n', stdout)
+        with open(style, 'w') as file:
+            file.write('{')
+        self.assertEqual(self.run_main('--style', style, self.directory)[0],
+                         2)
+        self.assertEqual(self.read('a.el'), self.files['a.el'])
+
+    def test_index(self):
+        with open(self.path('sub/macros.el'), 'w') as file:
+            file.write('(defmacro my-when (c &rest body)\n'
+                       '  (declare (indent 1)) nil)\n')
+        with open(self.path('sub/d.el'), 'w') as file:
+            file.write('(my-when x\n y\n z)\n')
+        index = self.path('index.sqlite')
+        for jobs in ('1', '2'):
+            status, stdout, _ = self.run_main(
+                '--diff', '--line-width', '8', '--index', index,
+                '-j', jobs, self.path('sub/macros.el'), self.path('sub/d.el'))
+            self.assertEqual(status, 1)
+            self.assertIn(' (my-when x\n- y\n- z)\n+  y\n+  z)\n', stdout)
+        status, stdout, _ = self.run_main(
+            '--diff', '--line-width', '8', self.path('sub/d.el'))
+        self.assertIn('+(my-when\n+  x\n', stdout)
+
+    def test_jobs(self):
+        paths = find_files([self.directory])
+        results = format_files(paths, 'diff')
+        self.assertEqual(format_files(paths, 'diff', jobs=2), results)
+        self.assertEqual([changed for changed, _, _ in results],
+                         [True, True, False, False, True])
+        self.assertIsNotNone(results[3][2])
+        status, _, stderr = self.run_main('-j', '2', self.directory)
+        self.assertEqual(status, 2)
+        self.assertEqual(self.read('.git/e.el'), '(g h)\n')
+        self.assertLess(stderr.index('.git/e.el'), stderr.index('a.el'))
@@ -0,0 +1,121 @@
+#! /usr/bin/env python3
+# pylint: disable=C0111,C0103
+
+import os
+import shutil
+import tempfile
+import unittest
+from src import (
+    parse, format_edits, range_edits, format_range, apply_edits, FormatCache)
+
+
+class TestFormatEdits(unittest.TestCase):
+
+    def test_format_edits(self):
+        strings = [
+            (';; x\n(a  b)\n\n(c)', [(5, 13, '(a b)\n')]),
+            ('(a b)\n(c)', []),
+            ('', []),
+            ('  (a)\n', [(0, 2, ''), (5, 6, '')]),
+            ("'(a)   'b", [(4, 7, '\n')]),
+            ('(a)\n;;; z\n', [(3, 10, '\n;;; Z')]),
+            ('(x (let ((a 1)) a)) (y)', [(0, 20, '(x\n  (let ((a 1))\n'
+                                                '    a))\n')]),
+        ]
+        for string, edits in strings:
+            with self.subTest(i=string):
+                self.assertEqual(format_edits(string), edits)
+                self.assertEqual(apply_edits(string, edits),
+                                 parse(string).pprint())
+
+    def test_formatted_source(self):
+        string = ("(defun f (x) (let ((a 1)) (+ a x))) ;; c\n"
+                  "'(q [v w] ,@z) (setf x y)\n;;; end")
+        pretty = parse(string).pprint()
+        edits = format_edits(string)
+        self.assertEqual(apply_edits(string, edits), pretty)
+        self.assertEqual(format_edits(pretty), [])
+        options = {'line_width': 20, 'compact': True}
+        edits = format_edits(string, options=options)
+        self.assertEqual(apply_edits(string, edits),
+                         parse(string).pprint(options=options))
+
+    def test_format_range(self):
+        string = (';; x\n(a  b)\n(defun f (x)\n  (let ((a 1)) (+ a\n'
+                  '  x))) ; c\n\n(c (d\n  e))   (g  h)\n')
+        strings = [
+            ((1, 1), []),
+            ((2, 2), [(5, 11, '(a b)')]),
+            ((4, 4), [(12, 51, '(defun f (x)\n  (let ((a 1))\n'
+                               '    (+ a x)))')]),
+            ((3, 3), [(12, 51, '(defun f (x)\n  (let ((a 1))\n'
+                               '    (+ a x)))')]),
+            ((2, 3), [(5, 11, '(a b)'),
+                      (12, 51, '(defun f (x)\n  (let ((a 1))\n'
+                               '    (+ a x)))')]),
+            ((6, 6), []),
+            ((7, 7), [(57, 68, '(c\n  (d e))')]),
+            ((8, 100), [(57, 68, '(c\n  (d e))'), (71, 77, '(g h)')]),
+            ((100, 100), []),
+        ]
+        for (start, end), edits in strings:
+            with self.subTest(i=(start, end)):
+                self.assertEqual(range_edits(string, start, end), edits)
+                self.assertEqual(format_range(string, start, end),
+                                 apply_edits(string, edits))
+        self.assertRaises(IndexError, range_edits, string, 0, 1)
+
+    def test_range_offset(self):
+        string = '(x (y\n      (z   w)\n      [1\n 2])) ; c\n'
+        for start, end in ((2, 2), (3, 3), (2, 3)):
+            with self.subTest(i=(start, end)):
+                self.assertEqual(format_range(string, start, end),
+                                 '(x (y\n     (z w)\n     [1 2])) ; c\n')
+        # list keeps class and column it has in form
+        string = ('(defun f ()\n  (let (aaaa\n     (bbbb 1)\n     cccc)\n'
+                  '    x))')
+        pretty = parse(string).pprint()
+        for line in (3, 4):
+            with self.subTest(i=line):
+                self.assertEqual(range_edits(string, line, line), [(
+                    19, 49, '(aaaa\n        (bbbb 1)\n        cccc)')])
+                self.assertEqual(format_range(string, line, line), pretty)
+        # open brace at column 0 inside of string is not a form start
+        string = '(defun f ()\n  "doc\n(x"\n  (a  b))\n'
+        self.assertEqual(format_range(string, 4, 4),
+                         '(defun f ()\n  "doc\n(x"\n  (a b))\n')
+        string = ('(defun f ()\n  "Usage:\n(f   a)"\n  (h 2))\n'
+                  '(defun g ()\n  "doc"\n  nil)\n')
+        self.assertEqual(range_edits(string, 3, 3), [])
+
+    def test_range_agrees_with_pprint(self):
+        string = ("(defun f (x) (let ((a 1) (b (g x y))) (when (and a b) "
+                  "(setf x 1 y 2) (list 'a `(b ,c) [d e])) x)) "
+                  "(progn (a) ;; z\n (b)) (c (d (e (f (g h i j k l m)))))")
+        for options in ({'line_width': 80, 'compact': False},
+                        {'line_width': 20, 'compact': False},
+                        {'line_width': 24, 'compact': True}):
+            pretty = parse(string).pprint(options=options)
+            lines = pretty.split('\n')
+            for first in range(len(lines)):
+                for last in range(first, len(lines)):
+                    broken = lines[:first] + [
+                        ' ' * (1 + k % 4) + line.lstrip().replace(' ', '  ')
+                        for k, line in enumerate(lines[first:last + 1])
+                    ] + lines[last + 1:]
+                    with self.subTest(i=(options['line_width'], first, last)):
+                        self.assertEqual(
+                            format_range('\n'.join(broken), first + 1,
+                                         last + 1, options),
+                            pretty)
+
+    def test_cache(self):
+        directory = tempfile.mkdtemp()
+        try:
+            string = '(a (b c))\n(d  e)'
+            with FormatCache(os.path.join(directory, 'cache')) as cache:
+                edits = format_edits(string, cache)
+                self.assertEqual(format_edits(string, cache), edits)
+                self.assertEqual((cache.hits, cache.misses), (2, 2))
+        finally:
+            shutil.rmtree(directory)
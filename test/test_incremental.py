@@ -0,0 +1,120 @@
+#! /usr/bin/env python3
+# pylint: disable=C0111,C0103
+
+import unittest
+from src import parse, reparse, tokenize, LispSyntaxError
+from src.nodes.base import BaseList, Quote, Atom
+
+
+def dump(node):
+    """Return node classes, spans and texts as nested tuples."""
+    if isinstance(node, BaseList):
+        return (type(node).__name__, node.start, node.end,
+                [dump(child) for child in node.children],
+                sorted((i, [dump(comment) for comment in comments])
+                       for i, comments in node.comments.items()))
+    if isinstance(node, Quote):
+        return ('Quote', node.prefix, node.start, node.end, dump(node.node))
+    if isinstance(node, Atom):
+        return ('Atom', node.atom, node.start, node.end)
+    return ('Comment', str(node), node.start, node.end)
+
+
+class TestReparse(unittest.TestCase):
+
+    string = (";;; header\n(defun a (x) \"doc\" (let ((b 1)) (+ b x))) ; c\n"
+              "\n'(q [v w] ?\\( ,@z)\n(setf x y)\n")
+
+    def assertReparsed(self, string, start, end, text):
+        edited = string[:start] + text + string[end:]
+        program = reparse(parse(string), start, end, text)
+        self.assertEqual(dump(program), dump(parse(edited)))
+        self.assertEqual(program.pprint(), parse(edited).pprint())
+        self.assertEqual(program.source.get_buffer(), edited)
+        return program
+
+    def test_edits(self):
+        edits = [
+            (0, 0, '(a)'), (11, 11, ' '), (17, 18, 'foo'), (37, 38, 'let*'),
+            (55, 56, ''), (57, 57, '(x)'), (62, 62, ','), (72, 72, ' a'),
+            (83, 84, 'setq'), (88, 88, ' ; tail'), (20, 24, '(x) (y)'),
+            (40, 48, ') (+ b x)'), (88, 88, 'z')]
+        for start, end, text in edits:
+            with self.subTest(i=(start, end, text)):
+                self.assertReparsed(self.string, start, end, text)
+
+    def test_edits_changing_tokens(self):
+        edits = [(27, 27, ';'), (11, 11, '"'), (85, 85, '"'),
+                 (55, 55, 'x'), (61, 61, '\\'), (70, 70, "'")]
+        for start, end, text in edits:
+            with self.subTest(i=(start, end, text)):
+                edited = self.string[:start] + text + self.string[end:]
+                try:
+                    expected = dump(parse(edited))
+                except LispSyntaxError:
+                    with self.assertRaises(LispSyntaxError):
+                        reparse(parse(self.string), start, end, text)
+                else:
+                    program = reparse(parse(self.string), start, end, text)
+                    self.assertEqual(dump(program), expected)
+
+    def test_edits_sequence(self):
+        string = self.string
+        program = parse(string)
+        for start, end, text in [(45, 45, ' c'), (12, 17, 'defmacro'),
+                                 (0, 11, ''), (70, 71, '[]')]:
+            string = string[:start] + text + string[end:]
+            program = reparse(program, start, end, text)
+            self.assertEqual(dump(program), dump(parse(string)))
+
+    def test_renamed_heads(self):
+        string = ('(let (aaaa\n (bbbb 1)\n cccc (dddd 2) eeee) x)\n'
+                  '(defun f ((a b) c) (setf (car x) 1 (cdr x) 2))')
+        edits = [(1, 4, 'foo'), (4, 4, 'x'), (1, 4, 'let*'),
+                 (46, 51, 'let'), (46, 51, 'foo'), (65, 69, 'let'),
+                 (65, 69, 'foo')]
+        for start, end, text in edits:
+            with self.subTest(i=(start, end, text)):
+                self.assertReparsed(string, start, end, text)
+
+    def test_old_program_unchanged(self):
+        old = parse(self.string)
+        expected = dump(old)
+        for start, end, text in [(0, 0, 'xx '), (45, 45, ' c'),
+                                 (83, 84, 'setq'), (56, 57, '')]:
+            with self.subTest(i=(start, end, text)):
+                new = reparse(old, start, end, text)
+                self.assertEqual(dump(old), expected)
+                self.assertEqual(old.pprint(), parse(self.string).pprint())
+                self.assertEqual(dump(new), dump(parse(
+                    self.string[:start] + text + self.string[end:])))
+
+    def test_touched_tokens(self):
+        forms = ['(defun f%s (x) (list x "%s"))' % (i, i) for i in range(100)]
+        string = '\n'.join(forms)
+        count = []
+
+        def tokenizer(source, start=0, end=None):
+            for token in tokenize(source, start, end):
+                count.append(token)
+                yield token
+
+        start = string.index('(x)', string.index('f50'))
+        program = reparse(parse(string), start + 1, start + 2, 'y z',
+                          tokenizer)
+        self.assertLessEqual(len(count), 3)
+        self.assertEqual(program.children[50].children[2],
+                         parse('(y z)').children[0])
+        self.assertEqual(dump(program),
+                         dump(parse(program.source.get_buffer())))
+
+        del count[:]
+        start = string.index('(defun f60') - 1
+        program = reparse(parse(string), start, start, "'", tokenizer)
+        self.assertGreaterEqual(len(count), 11 * len(forms))
+        self.assertEqual(program.children[60].prefix, "'")
+
+    def test_errors(self):
+        with self.assertRaises(LispSyntaxError) as error:
+            reparse(parse(self.string), 11, 12, '')
+        self.assertEqual(error.exception.message, 'extra brace')
@@ -0,0 +1,81 @@
+#! /usr/bin/env python3
+# pylint: disable=C0111,C0103
+
+import os
+import shutil
+import tempfile
+import unittest
+from src import parse, IndentIndex, indent_declarations
+
+
+MACROS = '''\
+;;; macros.el
+(defmacro with-foo (x &rest body)
+  "Doc (declare (indent 3))."
+  (declare (indent 1) (debug t))
+  `(let ((foo ,x)) ,@body))
+(cl-defmacro def-bar (name &key a)
+  (declare (indent defun))
+  nil)
+(defun baz (a b)
+  (declare (indent 2))
+  (interactive)
+  (list a b))
+(defun qux (a) (message "(declare (indent 1))") a)
+(defvar quux '(declare (indent 1)))
+'''
+
+
+class TestIndentIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'index.sqlite')
+        self.root = os.path.join(self.directory, 'project')
+        os.makedirs(os.path.join(self.root, 'lisp'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, text):
+        with open(os.path.join(self.root, name), 'w') as file:
+            file.write(text)
+
+    def test_indent_declarations(self):
+        self.assertEqual(indent_declarations(MACROS),
+                         {'with-foo': 1, 'def-bar': 'defun', 'baz': 2})
+        self.assertEqual(indent_declarations('(a) (b'), {})
+        self.assertEqual(indent_declarations(
+            '( defmacro a (x) ( declare (indent 1)) x)\n'
+            '(\ndefun b (x)\n  (\n   declare (indent 2)) x)\n'
+            '(;; c\n defmacro c (x) (declare ;; d\n (indent 3)))\n'
+            '(defmacro\td (x) (declare (indent defun)))'),
+            {'a': 1, 'b': 2, 'c': 3, 'd': 'defun'})
+        self.assertEqual(indent_declarations(
+            '(defmacro a () (declare (indent 1))) (b'), {'a': 1})
+
+    def test_update(self):
+        self._write('lisp/macros.el', MACROS)
+        self._write('other.el', '(defmacro my-when (c &rest body)\n'
+                                '  (declare (indent 1)) nil)')
+        self._write('notes.txt', '(defmacro x () (declare (indent 1)))')
+        with IndentIndex(self.path) as index:
+            self.assertEqual(index.update_tree(self.root), 2)
+            self.assertEqual(index.update_tree(self.root), 0)
+            self.assertEqual(index.rules(), {
+                'with-foo': 1, 'def-bar': 'defun', 'baz': 2, 'my-when': 1})
+            style = index.style({'indent': {'baz': None}})
+        self.assertEqual(
+            parse('(my-when a b c)', style=style).pprint(),
+            '(my-when a\n  b\n  c)')
+        self.assertEqual(parse('(baz a b)', style=style).pprint(),
+                         '(baz a b)')
+
+        with IndentIndex(self.path) as index:
+            self.assertEqual(len(index), 2)
+            self._write('other.el', '(defmacro my-when (c &rest body)\n'
+                                    '  (declare (indent 2)) nil) ; changed')
+            os.remove(os.path.join(self.root, 'lisp', 'macros.el'))
+            self.assertEqual(index.update_tree(self.root), 1)
+            self.assertEqual(index.rules(), {'my-when': 2})
+            self.assertEqual(len(index), 1)
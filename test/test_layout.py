@@ -0,0 +1,48 @@
+#! /usr/bin/env python3
+# pylint: disable=C0111,C0103
+
+import itertools
+import unittest
+from src import parse
+from src.layout import INDENTS, compile_layout, generator_layout
+from src.nodes.base import BaseList
+
+
+class TestLayout(unittest.TestCase):
+
+    def test_compile_layout(self):
+        layout = compile_layout((1, '', 1, False), (2, ' ', 2, True),
+                                (None, '\n', 3, False))
+        node = parse('(ab c d e f)')[0]
+        node.offset = 4
+        self.assertEqual(layout(node), [
+            ('', 5), (' ', 8), (' ', 8), ('\n       ', 7), ('\n       ', 7)])
+        self.assertEqual(layout(parse('()')[0]), [])
+        self.assertEqual(layout(parse('(a b)')[0]), [('', 1), (' ', 3)])
+        self.assertIs(layout(node)[3][0], INDENTS[7])
+
+    def test_generator_layouts(self):
+        string = ("(defun f (x) (let ((a 1) b) (if a (setf b 1 c [2 3]) "
+                  "(and (or a b) c)) ((g) h) (dolist (x y) x)))")
+        nodes, count = [parse(string)], 0
+        while nodes:
+            node = nodes.pop()
+            if not isinstance(node, BaseList):
+                continue
+            nodes.extend(node.children)
+            for offset in (0, 7):
+                node.offset = offset
+                for generator, layout in (
+                        (type(node).flat_generator, node.flat_layout),
+                        (type(node).nested_generator, node.nested_layout)):
+                    with self.subTest(i=(node, generator)):
+                        count += 1
+                        self.assertEqual(layout(), list(itertools.islice(
+                            generator(node), len(node))))
+        self.assertGreater(count, 40)
+
+    def test_generator_fallback(self):
+        defun = parse('(defun f (x) x)')[0]
+        layout = generator_layout(type(defun).flat_generator)
+        self.assertEqual(layout(defun), defun.flat_layout())
+        self.assertEqual(len(layout(defun)), 4)
@@ -2,8 +2,12 @@
 # pylint: disable=C0111,C0103
 
 
+import io
+import random
 import unittest
-from src import LispStream
+from src import (
+    LispStream, ChunkedLispStream, LispSyntaxError, tokenize, token_text, reference_tokens,
+    ATOM, STRING, COMMENT, OPEN, CLOSE, QUOTE, OPEN_VECTOR, CLOSE_VECTOR)
 
 
 class TestLispStream(unittest.TestCase):
@@ -69,3 +73,120 @@ class TestLispStream(unittest.TestCase):
                 stream = LispStream(string)
                 string = stream.read_comment()
                 self.assertEqual(string, ans)
+
+    def test_tokens(self):
+        stream = LispStream('(a "b\\"" ;c\n x\\ y)')
+        self.assertEqual(list(stream.tokens()), [
+            (3, 0, 1), (0, 1, 2), (1, 3, 8), (2, 9, 11), (0, 13, 17),
+            (4, 17, 18)])
+
+    def test_tokenize_same_as_reference(self):
+        strings = [
+            '', '   ', '(setq a 1)', '(a (b "c (" d) ;; e\n f)',
+            '"\\"" x', 'a\\ b c\\(d', '; only comment', 'a;b\r\n',
+            '(x\x0bY\x0c\tz)', 'юникод (символ)', ')(', '"\n"',
+            "(a 'b)", '(a [b])', '#x', '(a , b)', "`(a ,b ,@c #'d)",
+            '?a ?\\( ?( ?\\C-x ?\\^? a?b', '#s(a) #[1] #1=(a) #1# ## #$ #:a',
+            '#&3"a"', '#^[nil a] #^^[3 0] #^a #^^ #^^a[b]',
+            '#("s" 0 1 (face bold)) #(a)']
+        for string in strings:
+            with self.subTest(i=string):
+                self.assertEqual(list(tokenize(string)),
+                                 list(reference_tokens(string)))
+
+    def test_tokenize_errors_same_as_reference(self):
+        strings = ['(a "b', '"', 'a b\\', '\\', '#', '(a #)', '?\\',
+                   '#\\']
+        for string in strings:
+            with self.subTest(i=string):
+                with self.assertRaises(LispSyntaxError) as regexp_error:
+                    list(tokenize(string))
+                with self.assertRaises(LispSyntaxError) as reference_error:
+                    list(reference_tokens(string))
+                self.assertEqual(str(regexp_error.exception),
+                                 str(reference_error.exception))
+
+    def test_tokenize_random_strings_same_as_reference(self):
+        generator = random.Random(0)
+        alphabet = '()[]"\\;\n ?#\'`,@s&1=$^a\té'
+        for _ in range(2000):
+            string = ''.join(generator.choice(alphabet)
+                             for _ in range(generator.randint(0, 10)))
+            with self.subTest(i=string):
+                try:
+                    tokens = list(tokenize(string))
+                except LispSyntaxError as error:
+                    tokens = str(error)
+                try:
+                    reference = list(reference_tokens(string))
+                except LispSyntaxError as error:
+                    reference = str(error)
+                self.assertEqual(tokens, reference)
+
+    def test_tokenize_reader_syntax(self):
+        string = "`(a ,@b) #'c [d] ?\\( #s(e) #^[f] #^^[] #(\"g\" 0 1 h)"
+        self.assertEqual(
+            [(kind, string[start:end]) for kind, start, end in tokenize(string)],
+            [(QUOTE, '`'), (OPEN, '('), (ATOM, 'a'), (QUOTE, ',@'),
+             (ATOM, 'b'), (CLOSE, ')'), (QUOTE, "#'"), (ATOM, 'c'),
+             (OPEN_VECTOR, '['), (ATOM, 'd'), (CLOSE_VECTOR, ']'),
+             (ATOM, '?\\('), (QUOTE, '#s'), (OPEN, '('), (ATOM, 'e'),
+             (CLOSE, ')'), (QUOTE, '#^'), (OPEN_VECTOR, '['), (ATOM, 'f'),
+             (CLOSE_VECTOR, ']'), (QUOTE, '#^^'), (OPEN_VECTOR, '['),
+             (CLOSE_VECTOR, ']'), (QUOTE, '#'), (OPEN, '('),
+             (STRING, '"g"'), (ATOM, '0'), (ATOM, '1'), (ATOM, 'h'),
+             (CLOSE, ')')])
+
+    def test_tokenize_spans(self):
+        string = '(setq a "b") ; c'
+        self.assertEqual(list(tokenize(string)), [
+            (OPEN, 0, 1), (ATOM, 1, 5), (ATOM, 6, 7), (STRING, 8, 11),
+            (CLOSE, 11, 12), (COMMENT, 13, 16)])
+
+    def test_tokenize_bytes(self):
+        string = '(символ "строка") ; c'
+        source = string.encode('utf-8')
+        spans = list(tokenize(source))
+        self.assertEqual([kind for kind, _, _ in spans],
+                         [kind for kind, _, _ in tokenize(string)])
+        self.assertEqual(
+            [token_text(source, start, end) for _, start, end in spans],
+            [token_text(string, start, end)
+             for _, start, end in tokenize(string)])
+        self.assertEqual(spans[1], (ATOM, 1, 13))
+
+
+class TestChunkedLispStream(unittest.TestCase):
+
+    string = ('(setq слово "стр\\"ока") ;; комм\n(a (b c)) x\\ y '
+              "`(a ,@b) [#'c ?\\( #s(d) #^^[e] #(\"f\" 0 1 g)] ;")
+
+    def test_tokens_with_different_chunk_sizes(self):
+        tokens = list(tokenize(self.string))
+        for size in range(1, 10):
+            with self.subTest(i=size):
+                stream = ChunkedLispStream(io.StringIO(self.string),
+                                           chunk_size=size)
+                self.assertEqual(list(stream.tokens()), tokens)
+
+    def test_tokens_of_fed_chunks(self):
+        stream = ChunkedLispStream()
+        stream.feed('(ab')
+        self.assertEqual(list(stream.tokens()), [(OPEN, 0, 1)])
+        stream.feed('c "d')
+        self.assertEqual(list(stream.tokens()), [(ATOM, 1, 4)])
+        stream.feed('" ;')
+        self.assertEqual(list(stream.tokens()), [(STRING, 5, 8)])
+        stream.feed(' e\n)')
+        self.assertEqual(list(stream.tokens()),
+                         [(COMMENT, 9, 12), (CLOSE, 13, 14)])
+        self.assertEqual(stream.get_buffer(), '')
+
+    def test_unclosed_errors_at_the_end(self):
+        for string in ['(a "b', 'a\\']:
+            with self.subTest(i=string):
+                stream = ChunkedLispStream()
+                stream.feed(string)
+                list(stream.tokens())
+                stream.close()
+                self.assertRaises(LispSyntaxError, list, stream.tokens())
@@ -1,8 +1,12 @@
 #! /usr/bin/env python3
 # pylint: disable=C0111,C0103
 
+import contextlib
+import io
 import unittest
+from unittest import mock
 from src import parse
+from src.nodes.base import BaseList, CHUNK_FRAGMENTS, _emit
 
 
 class TestBaseNodesPprint(unittest.TestCase):
@@ -81,6 +85,43 @@ class TestBaseNodesPprint(unittest.TestCase):
         )
         self._test_parsed(strings)
 
+    def test_reader_syntax(self):
+        strings = (
+            ("(a 'b #'f ?\\( ,@g)",
+             """(a 'b #'f ?\\( ,@g)"""),
+
+            ('(a #^[nil b] #^^[3 0] #("s" 0 1 c))',
+             '''\
+(a
+  #^[nil b]
+  #^^[3 0]
+  #("s" 0 1 c))'''),
+
+            ("(a 'b `(c ,d ,@e) #'f)",
+             """\
+(a
+  'b
+  `(c ,d ,@e)
+  #'f)"""),
+
+            ("'(a (b c))",
+             """\
+'(a
+   (b c))"""),
+
+            ('(a [b c])',
+             """\
+(a
+  [b c])"""),
+
+            ('(a [b (c d)])',
+             """\
+(a
+  [b
+   (c d)])"""),
+        )
+        self._test_parsed(strings)
+
     def test_comments_levels(self):
         strings = (
             ('(hello ; simple comment\n me)',
@@ -108,6 +149,170 @@ class TestBaseNodesPprint(unittest.TestCase):
 
         self._test_parsed(strings)
 
+    def test_trailing_comments(self):
+        strings = (
+            ('(a b) ; end', '(a b) ; end'),
+            (';; only', ';; only'),
+            ('(a b ; in\n)', '''\
+(a
+  b ; in
+  )'''),
+            ('[a ;; c\n]', '''\
+[a
+ ;; c
+ ]'''),
+            ('(;; c\n)', '''\
+(
+ ;; c
+ )'''),
+        )
+        self._test_parsed(strings)
+
+    def test_comment_before_node(self):
+        strings = (
+            (';; c\n(a)', ';; c\n(a)'),
+            ('(;; c\n a)', '''\
+(
+ ;; c
+ a)'''),
+            ('(defun f ; c\n (x) x)', '''\
+(defun f ; c
+         (x)
+  x)'''),
+            ('(a ; c\n ; d\n b)', '''\
+(a ; c
+  ; d
+  b)'''),
+        )
+        self._test_parsed(strings)
+
+    def test_line_width(self):
+        string = '(foo ' + ' '.join('arg%d' % i for i in range(20)) + ')'
+        self.assertEqual(
+            parse(string).pprint(),
+            '(foo\n' + '\n'.join('  arg%d' % i for i in range(20)) + ')')
+        for width, answer in ((10, '(a\n  (bbb\n    cc))'),
+                              (11, '(a\n  (bbb cc))')):
+            with self.subTest(i=width):
+                options = {'line_width': width, 'compact': False}
+                self.assertEqual(
+                    parse('(a (bbb cc))').pprint(options=options), answer)
+        options = {'line_width': 40, 'compact': False}
+        strings = (
+            ('(setf (aref tbl (aaaaaaaaaa bbbbbbbbbb)) '
+             '(cccccccccc dddddddddd))', '''\
+(setf (aref
+        tbl
+        (aaaaaaaaaa
+          bbbbbbbbbb)) (cccccccccc
+                         dddddddddd))'''),
+            ('(setf a 1 bb (f c) ddd (g e f))',
+             '(setf a 1\n      bb (f c)\n      ddd (g e f))'),
+            ('(defun foo (aaaaaaaaaa bbbbbbbbbb cccccccccc) x)', '''\
+(defun foo (aaaaaaaaaa
+             bbbbbbbbbb
+             cccccccccc)
+  x)'''),
+        )
+        for string, answer in strings:
+            with self.subTest(i=string):
+                pretty = parse(string).pprint(options=options)
+                self.assertEqual(pretty, answer)
+                self.assertLessEqual(max(map(len, pretty.split('\n'))), 40)
+
+    def test_compact(self):
+        options = {'line_width': 20, 'compact': True}
+        strings = (
+            ('(a (b c) [d (e)])', '(a (b c) [d (e)])'),
+            ('(a (b c) [d (eeeeeeeeee)])', '''\
+(a
+  (b c)
+  [d (eeeeeeeeee)])'''),
+            ('(let ((a 1)) (b c))', '''\
+(let ((a 1))
+  (b c))'''),
+            ('(a (b ; c\n))', '''\
+(a
+  (b ; c
+   ))'''),
+        )
+        for string, answer in strings:
+            with self.subTest(i=string):
+                self.assertEqual(parse(string).pprint(options=options), answer)
+
+    def test_copy_source(self):
+        strings = ('(f (a b) [c "d"])', '(f (a  b))', '(f ( a b))',
+                   '(f (a b ))', '(f (a(b)  c))', "(f (' a(b)))",
+                   "(f (a ,@ b(c)))", '(f (#1= a(b)))', '(f ("a  b" c))',
+                   '(f (?\\( a))', '(f (a\tb))', '(f (a\n b))',
+                   '(f (a ; b\n c))', '(f (a "b\nc"))', '(f [(a) (b c)])',
+                   '(let ((a (b c))) (d (e f)))', '(f\n (a\n   b))',
+                   '(f\n\t(a b))', '(f\n  (a b)\n  )', '(f\n  [(a)\n   b])',
+                   "(f\n  '\n  (a\n    b))")
+        for options in ({'line_width': 80, 'compact': False},
+                        {'line_width': 12, 'compact': True}):
+            copy = dict(options, copy_source=True)
+            verbatim = dict(options, copy_source=False)
+            for string in strings:
+                pretty = parse(string).pprint(options=verbatim)
+                for source in (string, pretty):
+                    with self.subTest(i=(source, options['line_width'])):
+                        self.assertEqual(
+                            parse(source).pprint(options=copy),
+                            parse(source).pprint(options=verbatim))
+        parsed = parse('(a\n  (b c d))')
+        self.assertEqual(parsed.pprint(), '(a\n  (b c d))')
+        self.assertEqual(parsed[0][1][1].offset, 0)  # copied with (b ...)
+        parsed.pprint(options={'line_width': 80, 'copy_source': False})
+        self.assertNotEqual(parsed[0][1][1].offset, 0)
+        string = "(defun f (x)\n  (when\n    x\n    '(a\n       (b c))))"
+        slices = []
+
+        def get_slice(start, stop):
+            slices.append((start, stop))
+            return string[start:stop]
+
+        chunks = []
+        _emit(parse(string)[0], chunks.append,
+              {'line_width': 80, 'compact': False},
+              mock.Mock(get_slice=get_slice))
+        self.assertEqual(''.join(chunks), string)
+        self.assertIn((0, len(string)), slices)
+
+    def test_layout_scaling(self):
+        def work(string):
+            """Return number of layouts and children placed by them."""
+            counts = []
+
+            def counted(layout):
+                def wrapper(node):
+                    pairs = layout(node)
+                    counts.append(len(pairs))
+                    return pairs
+                return wrapper
+
+            program = parse(string)
+            classes = [BaseList]
+            with contextlib.ExitStack() as stack:
+                while classes:
+                    cls = classes.pop()
+                    classes.extend(cls.__subclasses__())
+                    for name in ('flat_layout', 'nested_layout'):
+                        if name in cls.__dict__:
+                            stack.enter_context(mock.patch.object(
+                                cls, name, counted(cls.__dict__[name])))
+                program.pprint()
+            return len(counts) + sum(counts)
+
+        for shape in (lambda n: '(f ' + 'x ' * n + ')',
+                      lambda n: '(' * n + ')' * n,
+                      lambda n: '(let (%s) %s)' % ('(a b) ' * n,
+                                                   '(f (g x)) ' * n)):
+            with self.subTest(i=shape(3)):
+                small = work(shape(1000))
+                self.assertGreaterEqual(small, 1000)
+                self.assertLessEqual(work(shape(8000)), 8 * small)
+
     @unittest.skip('TODO: write Programm class for more difficult tests')
     def test_comment_position(self):
         strings = (
@@ -136,6 +341,41 @@ class TestBaseNodesPprint(unittest.TestCase):
 
         self._test_parsed(strings)
 
+    def test_deep_nesting(self):
+        depth = 5000
+        string = "('[" * depth + 'b' + '])' * depth
+        parsed = parse(string)
+        self.assertEqual(parsed.pprint(), string)
+        self.assertEqual(parsed, parse(string))
+        self.assertNotEqual(parsed, parse(string.replace('b', 'c')))
+        self.assertEqual(hash(parsed[0]), hash(parse(string)[0]))
+        self.assertEqual(repr(parsed).count('Quote'), depth)
+        string = "'`" * depth + '"b\nc"'
+        parsed = parse(string)
+        self.assertEqual(parsed.pprint(), string)
+        quote = parsed[0]
+        self.assertEqual((quote.first_width, quote.last_width, len(quote)),
+                         (2 * depth + 2, 2, 2 * depth + 5))
+        self.assertTrue(quote.isflat)
+        self.assertEqual(hash(quote), hash(parse(string)[0]))
+        self.assertEqual(parsed, parse(string))
+
+    def test_write(self):
+        string = ';; c\n(a (b "c")) ; d\n' + '(%s)' % ' '.join(
+            '(x%d)' % i for i in range(CHUNK_FRAGMENTS))
+        parsed = parse(string)
+        chunks = []
+        parsed.write(chunks.append)
+        sink = io.StringIO()
+        parsed.write(sink)
+        self.assertEqual(''.join(chunks), parsed.pprint())
+        self.assertEqual(sink.getvalue(), parsed.pprint())
+        self.assertEqual(chunks[:3], [';; c\n', '(a\n  (b "c"))', ' ; d\n'])
+        self.assertGreater(len(chunks), 5)
+        sink = io.StringIO()
+        parsed[0].write(sink)
+        self.assertEqual(sink.getvalue(), '(a\n  (b "c"))')
+
     @unittest.skip('TODO: write Programm class for more difficult tests')
     def test_program(self):
         strings = (
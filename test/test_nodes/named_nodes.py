@@ -53,6 +53,12 @@ class TestNamedNodesPprint(unittest.TestCase):
     a
     1
     (+ 1 2)))'''),
+
+            ('(let [(a b) c] d)',
+             '''\
+(let [(a b)
+      c]
+  d)'''),
         )
 
         self._test_parsed(strings)
@@ -1,8 +1,15 @@
 #! /usr/bin/env python3
 # pylint: disable=C0111,C0103
 
+import io
+import os
+import tempfile
 import unittest
-from src import parse, LispSyntaxError
+from src import (
+    parse, iterparse, iterforms, write_forms, LispSyntaxError, tokenize, reference_tokens,
+    MmapLispStream, ChunkedLispStream, Atom, List, Vector)
+from src.nodes import Comment
+from src.nodes.base import FirstBraceAlignList
 
 
 class TestParse(unittest.TestCase):
@@ -45,3 +52,222 @@ class TestParse(unittest.TestCase):
     def test_extra_brace(self):
         string = '(setq a 1))'
         self.assertRaises(LispSyntaxError, parse, string)
+
+    def test_reference_tokenizer(self):
+        strings = ['(setq a 1)', '(setq (let* ((a b)) 1)) ;; c\n"s"']
+        for string in strings:
+            with self.subTest(i=string):
+                self.assertEqual(parse(string),
+                                 parse(string, reference_tokens))
+
+    def test_parse_mmap_stream(self):
+        string = '(setq слово "строка") ;; комментарий\n(a (b c))'
+        descriptor, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(string.encode('utf-8'))
+            for tokenizer in (tokenize, reference_tokens):
+                with self.subTest(i=tokenizer):
+                    with MmapLispStream(path) as stream:
+                        parsed = parse(stream, tokenizer)
+                        self.assertEqual(parsed, parse(string))
+                        self.assertEqual(parsed.pprint(),
+                                         parse(string).pprint())
+        finally:
+            os.remove(path)
+
+    def test_parse_chunked_stream(self):
+        string = '(setq a "1") ;; c\n(a (b "c" d))'
+        stream = ChunkedLispStream(io.StringIO(string), chunk_size=3)
+        self.assertEqual(parse(stream), parse(string))
+        stream = ChunkedLispStream(io.StringIO('(setq a "1)'), chunk_size=3)
+        self.assertRaises(LispSyntaxError, parse, stream)
+
+    def test_error_location(self):
+        strings = [('(a\n  "b', 2, 2, "can't read string at position 5"),
+                   ('(a)\n(b))', 2, 3, 'extra brace'),
+                   ('(a)\n (b (c)', 2, 1, 'unclosed brace'),
+                   ('(a\n b\\', 2, 1, "can't read atom at position 4")]
+        for string, line, column, message in strings:
+            with self.subTest(i=string):
+                with self.assertRaises(LispSyntaxError) as error:
+                    parse(string)
+                self.assertEqual((error.exception.line,
+                                  error.exception.column), (line, column))
+                self.assertEqual(error.exception.message, message)
+                self.assertEqual(
+                    str(error.exception),
+                    '%s (line %s, column %s)' % (message, line, column))
+
+    def test_node_spans(self):
+        string = '(setq a\n  (b "c")) ; d'
+        parsed = parse(string)
+        setq = parsed[0]
+        self.assertEqual((setq.start, setq.end), (0, 18))
+        self.assertEqual((setq[2].start, setq[2].end), (10, 17))
+        self.assertEqual(string[setq[2][1].start:setq[2][1].end], '"c"')
+        self.assertEqual(parsed.location(setq[2]), ((2, 2), (2, 9)))
+        comment = parsed.comments[1][0]
+        self.assertEqual((comment.start, comment.end), (19, 22))
+        let = parse('(let ((a b)) a)')[0]
+        self.assertEqual((let[1].start, let[1].end), (5, 12))
+
+    def test_reader_syntax(self):
+        strings = (("(a 'b)", [('a', ("'", 'b'))]),
+                   ("`(a ,b ,@c)", [('`', ('a', (',', 'b'), (',@', 'c')))]),
+                   ("(a ''b)", [('a', ("'", ("'", 'b')))]),
+                   ("(mapcar #'car [a (b c) ?\\)])",
+                    [('mapcar', ("#'", 'car'), ('a', ('b', 'c'), '?\\)'))]),
+                   ('#s(a b)', [('#s', ('a', 'b'))]))
+        self._test_parsed(strings)
+
+    def test_reader_syntax_errors(self):
+        strings = [('(a]', 'mismatched brace'), ('[a)', 'mismatched brace'),
+                   ("(a ')", 'nothing after reader prefix'),
+                   ("a '", 'nothing after reader prefix')]
+        for string, message in strings:
+            with self.subTest(i=string):
+                with self.assertRaises(LispSyntaxError) as error:
+                    parse(string)
+                self.assertEqual(error.exception.message, message)
+
+    def test_quote_span(self):
+        quote = parse("(a '(b c))")[0][1]
+        self.assertEqual((quote.start, quote.end), (3, 9))
+        self.assertEqual((quote.node.start, quote.node.end), (4, 9))
+
+    def test_compact_nodes(self):
+        program = parse("(let ((x nil)) (setq x 'nil) ; c\n x)")
+        let = program[0]
+        self.assertIs(let[1][0][1].atom, let[2][2].node.atom)
+        self.assertIs(let[1][0][0].atom, let[3].atom)
+        for node in (program, let, let[1], let[2][2], let[3],
+                     let.comments[3][0]):
+            with self.subTest(i=node):
+                self.assertFalse(hasattr(node, '__dict__'))
+        children = [Atom('a'), Atom('b')]
+        self.assertIs(List(children).children, children)
+        self.assertIs(let[2].comments, parse('(a)')[0].comments)
+
+    def test_comment_table(self):
+        program = parse(';; a\n(b ; c\n (d ;; e\n f) ; g\n) ; h')
+        b, d = program[0], program[0][1]
+        self.assertIs(b.comments.table, program.comments.table)
+        self.assertIs(d.comments.table, program.comments.table)
+        self.assertEqual(len(program.comments.table), 5)
+        self.assertEqual(dict(b.comments), {1: ['c'], 2: ['g']})
+        self.assertEqual(list(d.comments.items()), [(1, ['e'])])
+        self.assertNotIn(0, b.comments)
+        self.assertRaises(KeyError, b.comments.__getitem__, 0)
+        self.assertEqual(sorted(program.comments), [0, 1])
+        node = List([Atom('a')], {1: [Comment('; b')], 0: [Comment(';; c')]})
+        self.assertEqual(node.comments[0], ['c'])
+        self.assertEqual(node.pprint(), '(\n ;; c\n a ; b\n )')
+
+    def test_fingerprint(self):
+        form = parse('(a "b")')[0]
+        self.assertEqual(form.fingerprint.hex(),
+                         'c550ace79a6b5e91f31cf249e7bbcb1a')
+        self.assertEqual(form.fingerprint,
+                         parse('  (a\n   "b")')[0].fingerprint)
+        self.assertEqual(hash(form), hash(parse('(a "b")')[0]))
+        strings = ['(a "c")', '[a "b"]', '(a "b" ; c\n)', '(a \'"b")',
+                   '(a ("b"))', '("b" a)', '(a "b" nil)']
+        for string in strings:
+            with self.subTest(i=string):
+                other = parse(string)[0]
+                self.assertNotEqual(form.fingerprint, other.fingerprint)
+                self.assertNotEqual(form, other)
+        self.assertEqual(form, ['a', '"b"'])
+
+    def test_widths(self):
+        form = parse('(a \'(b "c") [] "d\nef" g)')[0]
+        self.assertEqual([node.width for node in form], [1, 8, 2, None, 1])
+        self.assertEqual((form.width, form.first_width, form.last_width),
+                         (None, 17, 6))
+        self.assertEqual((form[1].first_width, form[3].last_width), (8, 3))
+        for string in ('(a ; b\n)', '(a (b ; c\n))', '(let ((a b)) a)',
+                       '(("a\nb") (c ; d\n))'):
+            with self.subTest(i=string):
+                self.assertIsNone(parse(string)[0].first_width)
+        let = parse('(let ((a b) c) d)')[0]
+        self.assertEqual((let[1].node_name, let[1].width),
+                         ('FirstBraceAlignList', 9))
+        bindings = parse('(let [a b] c)')[0][1]
+        self.assertIsInstance(bindings, Vector)
+        form = parse('(a (b))')[0]
+        fingerprint = form.fingerprint
+        self.assertIs(form.rewrap(FirstBraceAlignList).fingerprint,
+                      fingerprint)
+        self.assertEqual(bindings.rewrap(List).width, bindings.width)
+
+
+class TestIterparse(unittest.TestCase):
+
+    def test_events(self):
+        string = "(a 'b [\"c\"]) ;; d"
+        self.assertEqual(list(iterparse(string)), [
+            ('open', '(', 0), ('atom', 1, 2), ('quote', 3, 4), ('atom', 4, 5),
+            ('open', '[', 6), ('string', 7, 10), ('close', 10),
+            ('close', 11), ('comment', 2, 13, 17)])
+
+    def test_events_of_streams(self):
+        string = '(a ;;; b\n "c")'
+        events = list(iterparse(string))
+        self.assertEqual(events[2], ('comment', 3, 3, 8))
+        stream = ChunkedLispStream(io.StringIO(string), chunk_size=2)
+        self.assertEqual(list(iterparse(stream)), events)
+        self.assertEqual(list(iterparse(string.encode('utf-8'))), events)
+
+    def test_errors(self):
+        strings = [('(a', 'unclosed brace', 0), ('a)', 'extra brace', 1),
+                   ('(a]', 'mismatched brace', 2),
+                   ("(')", 'nothing after reader prefix', 1),
+                   ("'", 'nothing after reader prefix', 0)]
+        for string, message, position in strings:
+            with self.subTest(i=string):
+                with self.assertRaises(LispSyntaxError) as error:
+                    list(iterparse(string))
+                self.assertEqual(error.exception.message, message)
+                self.assertEqual(error.exception.position, position)
+                self.assertRaises(LispSyntaxError, parse, string)
+
+
+class TestIterforms(unittest.TestCase):
+
+    def test_forms(self):
+        string = ";; a\n(b c) ; d\n'e\n;; f"
+        forms = list(iterforms(string))
+        self.assertEqual([node for _, node in forms],
+                         [('b', 'c'), ("'", 'e'), None])
+        self.assertEqual([[str(comment) for comment in comments]
+                          for comments, _ in forms],
+                         [[';; a'], ['; d'], [';; f']])
+        self.assertEqual(list(iterforms('')), [([], None)])
+
+    def test_write_forms(self):
+        string = ';; c\n(setq слово (a  "b")) ; d\n\n(let ((x 1)) x)\n;; e'
+        descriptor, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(string.encode('utf-8'))
+            with MmapLispStream(path) as stream:
+                sources = (string, ';; only', '',
+                           ChunkedLispStream(io.StringIO(string), chunk_size=3),
+                           stream)
+                for source in sources:
+                    with self.subTest(i=source):
+                        sink = io.StringIO()
+                        write_forms(source, sink)
+                        text = string if isinstance(source, ChunkedLispStream) \
+                            or source is stream else source
+                        self.assertEqual(sink.getvalue(), parse(text).pprint())
+        finally:
+            os.remove(path)
+
+    def test_errors(self):
+        sink = io.StringIO()
+        with self.assertRaises(LispSyntaxError) as error:
+            write_forms('(a  b)\n(c', sink)
+        self.assertEqual((error.exception.line, error.exception.column), (2, 0))
+        self.assertEqual(sink.getvalue(), '(a b)')
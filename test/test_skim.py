@@ -0,0 +1,62 @@
+#! /usr/bin/env python3
+# pylint: disable=C0111,C0103
+
+import unittest
+from src import parse, skim, parse_lazy, LispSyntaxError
+
+
+class TestSkim(unittest.TestCase):
+
+    def test_skim(self):
+        string = "(a 'b) ;; c\n'(x [y \"(\" ?( ?\\( ;)\n z]) foo?( bar) \"s\""
+        self.assertEqual(list(skim(string)), [
+            ('form', 0, 6), ('comment', 7, 11), ('form', 12, 37),
+            ('form', 38, 42), ('form', 42, 48), ('form', 49, 52)])
+
+    def test_skim_bytes(self):
+        string = '(сим "вол") ;; c'
+        self.assertEqual(list(skim(string.encode('utf-8'))),
+                         [('form', 0, 17), ('comment', 18, 22)])
+
+    def test_skim_errors(self):
+        strings = [('(a', 'unclosed brace'), ('a)', 'extra brace'),
+                   ('(a "b)', "can't read string at position 3"),
+                   ("a '", 'nothing after reader prefix')]
+        for string, message in strings:
+            with self.subTest(i=string):
+                with self.assertRaises(LispSyntaxError) as error:
+                    list(skim(string))
+                self.assertEqual(error.exception.message, message)
+
+
+class TestLazyProgram(unittest.TestCase):
+
+    string = ";;; header\n(defun a () 1)\n\n(let ((b 1)) b) ; end\n'(c [d])"
+
+    def test_same_as_parse(self):
+        program = parse_lazy(self.string)
+        self.assertEqual(program, parse(self.string))
+        self.assertEqual(program.pprint(), parse(self.string).pprint())
+
+    def test_forms_are_parsed_on_access(self):
+        program = parse_lazy(self.string)
+        self.assertEqual(len(program), 3)
+        self.assertFalse(program.children.is_parsed(1))
+        self.assertEqual(program[1], parse('(let ((b 1)) b)')[0])
+        self.assertTrue(program.children.is_parsed(1))
+        self.assertFalse(program.children.is_parsed(0))
+        self.assertEqual(program.children.get_span(1), (27, 42))
+        self.assertEqual((program[1].start, program[1].end), (27, 42))
+
+    def test_source_is_skimmed_on_access(self):
+        program = parse_lazy('(a b) (c d) (e')
+        self.assertEqual(program[1], parse('(c d)')[0])
+        self.assertFalse(program.children.is_skimmed())
+        self.assertRaises(LispSyntaxError, len, program)
+
+    def test_errors_in_forms_are_raised_on_access(self):
+        program = parse_lazy('(a b)\n(c\n [d)]')
+        self.assertEqual(program[0], parse('(a b)')[0])
+        with self.assertRaises(LispSyntaxError) as error:
+            program[1]
+        self.assertEqual(error.exception.line, 3)
@@ -2,8 +2,11 @@
 # pylint: disable=C0111,C0103
 
 
+import io
+import os
+import tempfile
 import unittest
-from src import Stream
+from src import Stream, MmapStream, ChunkedStream, LineIndex
 
 
 class TestStream(unittest.TestCase):
@@ -103,3 +106,115 @@ class TestStream(unittest.TestCase):
         for string in self.strings:
             with self.subTest(i=string):
                 self.assertEqual(Stream(string).get_full_size(), len(string))
+
+
+class TestMmapStream(unittest.TestCase):
+
+    def setUp(self):
+        descriptor, self.path = tempfile.mkstemp()
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write('слово word'.encode('utf-8'))
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_get_and_skip(self):
+        with MmapStream(self.path) as stream:
+            self.assertEqual(stream.get_full_size(), 15)
+            stream.skipnot()
+            self.assertEqual(stream.get_state(), 10)
+            stream.skip()
+            self.assertEqual(stream.get(), 'w')
+            self.assertEqual(stream.get_state(), 12)
+
+    def test_get_slice(self):
+        with MmapStream(self.path) as stream:
+            self.assertEqual(stream.get_slice(0, 10), 'слово')
+            self.assertEqual(stream.get_slice(11), 'word')
+
+    def test_release(self):
+        with MmapStream(self.path) as stream:
+            stream.release(15)
+            stream.release(0)
+            self.assertEqual(stream.get_slice(0, 10), 'слово')
+
+    def test_empty_file(self):
+        with open(self.path, 'wb'):
+            pass
+        with MmapStream(self.path) as stream:
+            self.assertFalse(bool(stream))
+            self.assertIsNone(stream.get())
+
+
+class TestChunkedStream(unittest.TestCase):
+
+    def test_feed_and_discard(self):
+        stream = ChunkedStream()
+        stream.feed('hello ')
+        stream.skipnot()
+        self.assertEqual(stream.get_state(), 5)
+        stream.discard()
+        stream.feed('world')
+        stream.skip()
+        self.assertEqual(stream.get_state(), 6)
+        self.assertEqual(stream.get_full_size(), 11)
+        self.assertEqual(stream.get_slice(6, 11), 'world')
+        self.assertRaises(ValueError, stream.get_slice, 0, 5)
+        stream.set_state(0)
+        self.assertEqual(stream.get_state(), 5)
+
+    def test_feed_split_encoded_character(self):
+        data = 'слово'.encode('utf-8')
+        stream = ChunkedStream()
+        for i in range(len(data)):
+            stream.feed(data[i:i + 1])
+        stream.close()
+        self.assertEqual(stream.get_slice(0), 'слово')
+        self.assertRaises(ValueError, stream.feed, 'a')
+
+    def test_read(self):
+        stream = ChunkedStream(io.StringIO('hello'), chunk_size=2)
+        while stream.read():
+            pass
+        self.assertTrue(stream.closed)
+        self.assertEqual(stream.get_slice(0), 'hello')
+        self.assertFalse(ChunkedStream().read())
+
+
+class TestLineIndex(unittest.TestCase):
+
+    def test_position(self):
+        lines = LineIndex('ab\ncd\n\nef')
+        self.assertEqual(len(lines), 4)
+        positions = [(1, 0), (1, 1), (1, 2), (2, 0), (2, 1), (2, 2), (3, 0),
+                     (4, 0), (4, 1), (4, 2)]
+        for offset, position in enumerate(positions):
+            with self.subTest(i=offset):
+                self.assertEqual(lines.position(offset), position)
+                self.assertEqual(lines.offset(*position), offset)
+
+    def test_offset_out_of_range(self):
+        lines = LineIndex('a\nb')
+        self.assertRaises(IndexError, lines.offset, 0)
+        self.assertRaises(IndexError, lines.offset, 3)
+
+    def test_discard(self):
+        lines = LineIndex('ab\ncd\nef')
+        lines.discard(4)
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines.position(4), (2, 1))
+        self.assertEqual(lines.offset(3, 1), 7)
+        self.assertRaises(ValueError, lines.position, 2)
+        self.assertRaises(IndexError, lines.offset, 1)
+
+    def test_bytes(self):
+        lines = LineIndex('ы\nы'.encode('utf-8'))
+        self.assertEqual(lines.position(3), (2, 0))
+
+    def test_stream_lines(self):
+        self.assertEqual(Stream('a\nb').lines.position(2), (2, 0))
+        stream = ChunkedStream()
+        stream.feed('a\nb')
+        stream.discard(2)
+        stream.feed('c\nd')
+        self.assertEqual(stream.lines.position(5), (3, 0))
@@ -0,0 +1,78 @@
+#! /usr/bin/env python3
+# pylint: disable=C0111,C0103
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from src import (
+    parse, parse_lazy, reparse, Style, StyleError, load_style, FormatCache)
+
+CONFIG = {'indent': {'when': 1, 'defmacro': 'defun', 'my-let': 'let',
+                     'and': None, 'foo': 'function', 'unless': 'when'}}
+
+
+class TestStyle(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_rules(self):
+        style = Style.from_config(CONFIG)
+        self.assertEqual(style.rules, {
+            'when': 1, 'defmacro': 'DefunList', 'my-let': 'LetList',
+            'and': 'List', 'foo': 'FunctionAlignList', 'unless': 1})
+        self.assertNotIn('and', style.nodes)
+        self.assertIs(style.nodes['when'], style.nodes['unless'])
+        strings = (
+            ('(when a b c)', '(when a\n  b\n  c)'),
+            ('(defmacro m (x) y)', '(defmacro m (x)\n  y)'),
+            ('(my-let ((a 1) (b 2)) a)',
+             '(my-let ((a 1)\n         (b 2))\n  a)'),
+            ('(and a (b c))', '(and\n  a\n  (b c))'),
+            ('(foo a (b c))', '(foo a\n     (b c))'),
+        )
+        for string, answer in strings:
+            with self.subTest(i=string):
+                self.assertEqual(parse(string, style=style).pprint(), answer)
+                self.assertEqual(
+                    parse_lazy(string, style=style).pprint(), answer)
+        self.assertEqual(parse('(when a b c)').pprint(), '(when a b c)')
+
+    def test_errors(self):
+        configs = [[], {'indent': []}, {'indent': {'a': -1}},
+                   {'indent': {'a': 'b', 'b': 'a'}}, {'indent': {'a': True}},
+                   {'indent': {'a': 1.5}}]
+        for config in configs:
+            with self.subTest(i=config):
+                self.assertRaises(StyleError, Style.from_config, config)
+
+    def test_load_style(self):
+        path = os.path.join(self.directory, 'style.json')
+        with open(path, 'w') as file:
+            json.dump(CONFIG, file)
+        style = load_style(path)
+        self.assertEqual(style.rules, Style.from_config(CONFIG).rules)
+        self.assertEqual(load_style(path).digest, style.digest)
+        with open(path, 'w') as file:
+            json.dump(CONFIG, file, indent=4)
+        self.assertEqual(load_style(path).digest, style.digest)
+        self.assertEqual(Style.from_config(CONFIG).digest, style.digest)
+        with open(path, 'w') as file:
+            file.write('{"indent": ')
+        self.assertRaises(StyleError, load_style, path)
+
+    def test_reparse_and_cache(self):
+        style = Style.from_config(CONFIG)
+        string = '(a (when x y z))'
+        program = parse(string, style=style)
+        new = reparse(program, 9, 10, 'xx', style=style)
+        self.assertEqual(new.pprint(), '(a\n  (when xx\n    y\n    z))')
+        path = os.path.join(self.directory, 'cache.sqlite')
+        with FormatCache(path) as default, \
+                FormatCache(path, style=style) as styled:
+            self.assertNotEqual(default.key(string), styled.key(string))
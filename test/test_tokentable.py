@@ -0,0 +1,47 @@
+#! /usr/bin/env python3
+# pylint: disable=C0111,C0103
+
+import unittest
+from src import (
+    parse, parse_table, TokenTable, LispSyntaxError,
+    ATOM, STRING, COMMENT, OPEN, CLOSE)
+
+
+class TestTokenTable(unittest.TestCase):
+
+    def test_build(self):
+        table = TokenTable.build('(a (b "c")) ; d\ne')
+        self.assertEqual(len(table), 9)
+        self.assertEqual(list(table.kinds), [
+            OPEN, ATOM, OPEN, ATOM, STRING, CLOSE, CLOSE, COMMENT, ATOM])
+        self.assertEqual(list(table.depths), [0, 1, 1, 2, 2, 1, 0, 0, 0])
+        self.assertEqual(table.token(4), (STRING, 6, 9, 2))
+        self.assertEqual(table.get_text(4), '"c"')
+        table.starts.append(3 << 31)  # offsets over 2 GiB fit
+        self.assertEqual(table.starts[-1], 3 << 31)
+
+    def test_build_errors(self):
+        for string in ['(a', 'a)', '"a', '(a]']:
+            with self.subTest(i=string):
+                self.assertRaises(LispSyntaxError, TokenTable.build, string)
+
+    def test_forms(self):
+        table = TokenTable.build('(a (b "c")) ; d\ne ()')
+        self.assertEqual(list(table.forms()),
+                         [(0, 7), (7, 8), (8, 9), (9, 11)])
+        table = TokenTable.build("'(a [b]) #'c [d]")
+        self.assertEqual(list(table.forms()), [(0, 7), (7, 9), (9, 12)])
+        string = "'\n; c\nx (y)"
+        table = TokenTable.build(string)
+        self.assertEqual(list(table.forms()), [(0, 3), (3, 6)])
+        self.assertEqual(parse_table(table, 0, 3).pprint(), "; c\n'x")
+        self.assertEqual(parse_table(table, 0, 3)[0], parse("'x")[0])
+
+    def test_parse_table(self):
+        string = '(setq a 1) ;; c\n(let ((a b)) (c "d"))'
+        table = TokenTable.build(string)
+        self.assertEqual(parse_table(table), parse(string))
+        self.assertEqual(parse_table(table).pprint(), parse(string).pprint())
+        first, stop = list(table.forms())[-1]
+        self.assertEqual(parse_table(table, first, stop),
+                         [('let', (('a', 'b'),), ('c', '"d"'))])